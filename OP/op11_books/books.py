@@ -1,4 +1,11 @@
 """Books."""
+import heapq
+import itertools
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 
 class Book:
@@ -41,14 +48,344 @@ class Book:
         return f'"{self.title}" by {self.author}'
 
 
-def author_book_count(library: list[Book], author: str) -> int:
+def get_century(year: int) -> int:
+    """
+    Find the century of the given year.
+
+    :param year: The year.
+    :return: The century, for example 20 for years 1901 to 2000.
+    """
+    return (year - 1) // 100 + 1
+
+
+class Library:
+    """
+    Collection of books with indexes for the query functions.
+
+    Books are indexed by author, genre, year and century when they are added, and sums of pages and sales are kept
+    up to date, so the functions of this module answer queries on a Library without going through all the books.
+    Sales of a book in a Library must be changed with record_sale to keep the sums right.
+    """
+
+    def __init__(self, books: list[Book] = ()):
+        """
+        Initialize a Library object.
+
+        :param books: The books in the library.
+        """
+        self.books = []
+        self.book_ids = set()
+        self.books_by_author = {}
+        self.books_by_genre_and_year = {}
+        self.author_page_counts = {}
+        self.author_sales = {}
+        self.genre_sales = {}
+        self.century_author_sales = {}
+        self.most_popular_book = None
+        self.most_popular_author = None
+        self.best_selling_genre = None
+        self.century_leaders = {}
+        for book in books:
+            self.add(book)
+
+    def __len__(self) -> int:
+        """Return the number of books in the library."""
+        return len(self.books)
+
+    def __iter__(self):
+        """Return an iterator over the books in the library."""
+        return iter(self.books)
+
+    def add(self, book: Book):
+        """
+        Add a book to the library and its indexes.
+
+        :param book: The book to add.
+        """
+        self.books.append(book)
+        self.book_ids.add(id(book))
+        self.books_by_author.setdefault(book.author, []).append(book)
+        for genre in dict.fromkeys(book.genres):
+            self.books_by_genre_and_year.setdefault((genre, book.year), []).append(book)
+        self.author_page_counts[book.author] = self.author_page_counts.get(book.author, 0) + book.pages
+        if self.most_popular_book is None or book.sales > self.most_popular_book.sales:
+            self.most_popular_book = book
+        self._add_sales(book, book.sales)
+
+    def record_sale(self, book: Book, sales: int = 1):
+        """
+        Change the sales of a book in the library and update all the sales sums and leaders.
+
+        Sales are usually positive. A negative amount (returned books) is also allowed, then a leader whose sales
+        went down is looked up again among its group.
+
+        Sales are part of Book.__hash__, so after a sale the book can no longer be found in a set or as a dictionary
+        key it was put in before. The library itself tracks its books by identity.
+
+        :param book: A book in the library (the same object that was added).
+        :param sales: The amount of new sales.
+        :raises ValueError: If the book is not in the library.
+        """
+        if id(book) not in self.book_ids:
+            raise ValueError(f"{book} is not in the library.")
+        book.sales += sales
+        if sales >= 0:
+            if book.sales > self.most_popular_book.sales:
+                self.most_popular_book = book
+        elif book is self.most_popular_book:
+            self.most_popular_book = max(self.books, key=lambda other: other.sales)
+        self._add_sales(book, sales)
+
+    def _add_sales(self, book: Book, sales: int):
+        """
+        Add sales of a book to the sales sums and update the leaders.
+
+        :param book: The book that was sold.
+        :param sales: The amount of sales to add.
+        """
+        author_sales = self.author_sales[book.author] = self.author_sales.get(book.author, 0) + sales
+        if self.most_popular_author is None or author_sales > self.author_sales[self.most_popular_author]:
+            self.most_popular_author = book.author
+        elif sales < 0 and book.author == self.most_popular_author:
+            self.most_popular_author = max(self.author_sales, key=self.author_sales.get)
+        for genre in book.genres:
+            genre_sales = self.genre_sales[genre] = self.genre_sales.get(genre, 0) + sales
+            if self.best_selling_genre is None or genre_sales > self.genre_sales[self.best_selling_genre]:
+                self.best_selling_genre = genre
+            elif sales < 0 and genre == self.best_selling_genre:
+                self.best_selling_genre = max(self.genre_sales, key=self.genre_sales.get)
+        century = get_century(book.year)
+        authors = self.century_author_sales.setdefault(century, {})
+        century_sales = authors[book.author] = authors.get(book.author, 0) + sales
+        leader = self.century_leaders.get(century)
+        if leader is None or century_sales > authors[leader]:
+            self.century_leaders[century] = book.author
+        elif sales < 0 and book.author == leader:
+            self.century_leaders[century] = max(authors, key=authors.get)
+
+
+class BookTable:
+    """
+    Columnar copy of a list of books backed by NumPy arrays.
+
+    Pages, sales and years are integer arrays, authors and titles are integer codes (codes of titles follow
+    alphabetical order) and genres are bitsets, so the queries of this module run as vectorised array operations.
+    Every (book, genre) pair is also kept as a row and a genre code, so sums over genres are a single bincount.
+    Requires NumPy.
+    """
+
+    def __init__(self, books: list[Book]):
+        """
+        Initialize a BookTable object.
+
+        :param books: The books to copy into columns.
+        :raises ImportError: If NumPy is not installed.
+        """
+        if np is None:
+            raise ImportError("BookTable requires NumPy.")
+        self.books = list(books)
+        count = len(self.books)
+        self.pages = np.fromiter((book.pages for book in self.books), dtype=np.int64, count=count)
+        self.sales = np.fromiter((book.sales for book in self.books), dtype=np.int64, count=count)
+        self.years = np.fromiter((book.year for book in self.books), dtype=np.int64, count=count)
+        authors = np.array([book.author for book in self.books], dtype=object)
+        titles = np.array([book.title for book in self.books], dtype=object)
+        self.authors, self.author_first_rows, self.author_codes = np.unique(authors, return_index=True,
+                                                                            return_inverse=True)
+        self.title_codes = np.unique(titles, return_inverse=True)[1]
+        self.author_indexes = {author: code for code, author in enumerate(self.authors)}
+
+        self.genres = sorted({genre for book in self.books for genre in book.genres})
+        self.genre_indexes = {genre: index for index, genre in enumerate(self.genres)}
+        genre_lists = [[self.genre_indexes[genre] for genre in dict.fromkeys(book.genres)] for book in self.books]
+        self.genre_rows = np.repeat(np.arange(count), [len(codes) for codes in genre_lists])
+        self.genre_codes = np.fromiter(itertools.chain.from_iterable(genre_lists), dtype=np.int64,
+                                       count=len(self.genre_rows))
+        words = max(1, (len(self.genres) + 63) // 64)
+        bitsets = [sum(1 << code for code in codes) for codes in genre_lists]
+        self.genre_bits = np.array(
+            [[(bitset >> (64 * word)) & (2 ** 64 - 1) for word in range(words)] for bitset in bitsets],
+            dtype=np.uint64,
+        ).reshape(count, words)
+
+    def __len__(self) -> int:
+        """Return the number of books in the table."""
+        return len(self.books)
+
+    def __iter__(self):
+        """Return an iterator over the books in the table."""
+        return iter(self.books)
+
+    def has_genre(self, genre: str):
+        """
+        Find the books that have the given genre.
+
+        :param genre: The genre.
+        :return: A boolean array, True for the books that have the genre.
+        """
+        index = self.genre_indexes.get(genre)
+        if index is None:
+            return np.zeros(len(self.books), dtype=bool)
+        word = self.genre_bits[:, index // 64]
+        return (word >> np.uint64(index % 64)) & np.uint64(1) == 1
+
+    def author_book_count(self, author: str) -> int:
+        """Return the amount of books written by the author, see author_book_count."""
+        code = self.author_indexes.get(author)
+        return 0 if code is None else int(np.count_nonzero(self.author_codes == code))
+
+    def author_page_count(self, author: str) -> int:
+        """Return the total number of pages written by the author, see author_page_count."""
+        code = self.author_indexes.get(author)
+        return 0 if code is None else int(self.pages[self.author_codes == code].sum())
+
+    def most_popular_book(self) -> Book:
+        """Return the book with the most sales, see most_popular_book."""
+        if not self.books:
+            raise ValueError("most_popular_book() arg is an empty table")
+        return self.books[int(np.argmax(self.sales))]
+
+    def most_popular_author(self) -> str:
+        """Return the author with the most sales, see most_popular_author."""
+        if not self.books:
+            raise ValueError("most_popular_author() arg is an empty table")
+        sales_by_author = np.bincount(self.author_codes, weights=self.sales, minlength=len(self.authors))
+        best = np.flatnonzero(sales_by_author == sales_by_author.max())
+        return self.authors[best[np.argmin(self.author_first_rows[best])]]
+
+    def average_author_book_length(self, author: str) -> float:
+        """Return the average length of the author's books, see average_author_book_length."""
+        return self.author_page_count(author) / self.author_book_count(author)
+
+    def find_best_selling_genre(self) -> str:
+        """Return the genre with the most total sales, see find_best_selling_genre."""
+        if not self.genres:
+            raise ValueError("find_best_selling_genre() arg has no genres")
+        sales_by_genre = np.bincount(self.genre_codes, weights=self.sales[self.genre_rows], minlength=len(self.genres))
+        return self.genres[int(np.argmax(sales_by_genre))]
+
+    def find_books_by_genre_and_year(self, genre: str, year: int) -> list[Book]:
+        """Return the books of the genre and year by sales and title, see find_books_by_genre_and_year."""
+        positions = np.flatnonzero((self.years == year) & self.has_genre(genre))
+        order = np.lexsort((self.title_codes[positions], -self.sales[positions]))
+        return [self.books[position] for position in positions[order]]
+
+    def most_popular_author_per_century(self) -> dict[int, str]:
+        """Return the author with the most sales for each century, see most_popular_author_per_century."""
+        centuries = (self.years - 1) // 100 + 1
+        groups, first_rows, group_codes = np.unique(centuries * len(self.authors) + self.author_codes,
+                                                    return_index=True, return_inverse=True)
+        sales = np.bincount(group_codes, weights=self.sales, minlength=len(groups))
+        group_centuries, group_authors = np.divmod(groups, len(self.authors))
+        order = np.lexsort((first_rows, -sales, group_centuries))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = group_centuries[order][1:] != group_centuries[order][:-1]
+        leaders = order[first]
+        return {int(group_centuries[group]): self.authors[group_authors[group]] for group in leaders}
+
+    def top_positions(self, positions, k: int):
+        """
+        Find the k books with the most sales among the given books, ties sorted by title (alphabetically).
+
+        The k best sales are selected with argpartition, and only the books selling at least as much are sorted.
+
+        :param positions: An array of positions of books in the table.
+        :param k: The number of books to find.
+        :return: An array of at most k positions, sorted by sales (descending) and title (alphabetically).
+        """
+        if k < 1 or not len(positions):
+            return positions[:0]
+        sales = self.sales[positions]
+        if k < len(positions):
+            threshold = sales[np.argpartition(-sales, k - 1)[k - 1]]
+            positions = positions[sales >= threshold]
+        order = np.lexsort((self.title_codes[positions], -self.sales[positions]))
+        return positions[order[:k]]
+
+    def top_books(self, k: int) -> list[Book]:
+        """Return the k books with the most sales, see top_books."""
+        return [self.books[position] for position in self.top_positions(np.arange(len(self.books)), k)]
+
+    def top_authors(self, k: int) -> list[tuple[str, int]]:
+        """Return the k authors with the most sales, ties in the order the authors first appear, see top_authors."""
+        if k < 1 or not self.books:
+            return []
+        sales = np.bincount(self.author_codes, weights=self.sales, minlength=len(self.authors)).astype(np.int64)
+        order = np.lexsort((self.author_first_rows, -sales))[:k]
+        return [(self.authors[code], int(sales[code])) for code in order]
+
+    def find_books_by_genre_and_year_page(self, genre: str, year: int, page: int, page_size: int) -> list[Book]:
+        """Return one page of the books of the genre and year, see find_books_by_genre_and_year_page."""
+        positions = np.flatnonzero((self.years == year) & self.has_genre(genre))
+        positions = self.top_positions(positions, page * page_size)[(page - 1) * page_size:]
+        return [self.books[position] for position in positions]
+
+    def grouping(self, name: str) -> tuple:
+        """
+        Find the group of every book for one grouping of aggregate.
+
+        :param name: 'author', 'genre', 'century' or 'year'.
+        :return: A tuple of (rows, codes, labels): row of a book and code of its group for every (book, group) pair,
+         sorted by row, and the group for every code. A book is in each of its genres once.
+        """
+        if name == 'genre':
+            return self.genre_rows, self.genre_codes, self.genres
+        if name == 'author':
+            return np.arange(len(self.books)), self.author_codes, list(self.authors)
+        values = self.years if name == 'year' else (self.years - 1) // 100 + 1
+        labels, codes = np.unique(values, return_inverse=True)
+        return np.arange(len(self.books)), codes, labels.tolist()
+
+    def group_totals(self, group_by, fields: list[str]) -> tuple[dict, dict]:
+        """
+        Count the books and sum the given fields in every group, see aggregate.
+
+        :param group_by: A grouping name, a pair of grouping names or None for the whole table.
+        :param fields: The fields to sum ('pages', 'sales' or 'year').
+        :return: A tuple of a dictionary from group to count and a dictionary from field to a dictionary from group
+         to sum. Groups are in the order they first appear in.
+        """
+        names = () if group_by is None else (group_by,) if isinstance(group_by, str) else group_by
+        if not names:
+            rows, codes, decode = np.arange(len(self.books)), np.zeros(len(self.books), dtype=np.int64), [None]
+        elif len(names) == 1:
+            rows, codes, decode = self.grouping(names[0])
+        else:
+            first_rows, first_codes, first_labels = self.grouping(names[0])
+            second_rows, second_codes, second_labels = self.grouping(names[1])
+            counts = np.bincount(second_rows, minlength=len(self.books))
+            starts = np.cumsum(counts) - counts
+            repeats = counts[first_rows]
+            rows = np.repeat(first_rows, repeats)
+            offsets = np.arange(len(rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+            second = second_codes[np.repeat(starts[first_rows], repeats) + offsets]
+            codes = np.repeat(first_codes, repeats) * len(second_labels) + second
+            decode = [(first, second) for first in first_labels for second in second_labels]
+        groups, first_seen, inverse = np.unique(codes, return_index=True, return_inverse=True)
+        order = np.argsort(first_seen, kind='stable')
+        keys = [decode[code] for code in groups[order].tolist()]
+        counts = np.bincount(inverse, minlength=len(groups))[order].tolist()
+        columns = {'pages': self.pages, 'sales': self.sales, 'year': self.years}
+        sums = {}
+        for field in fields:
+            totals = np.zeros(len(groups), dtype=np.int64)
+            np.add.at(totals, inverse, columns[field][rows])
+            sums[field] = dict(zip(keys, totals[order].tolist()))
+        return dict(zip(keys, counts)), sums
+
+
+def author_book_count(library: list[Book] | Library | BookTable, author: str) -> int:
     """
     Find the number of books written by the given author.
 
-    :param library: The list of books to search through.
+    :param library: The list of books, the Library or the BookTable to search through.
     :param author: The given author.
     :return: The amount of books written by the author.
     """
+    if isinstance(library, BookTable):
+        return library.author_book_count(author)
+    if isinstance(library, Library):
+        return len(library.books_by_author.get(author, []))
     number_of_books = 0
     for book in library:
         if book.author == author:
@@ -56,36 +393,52 @@ def author_book_count(library: list[Book], author: str) -> int:
     return number_of_books
 
 
-def author_page_count(library: list[Book], author: str) -> int:
+def author_page_count(library: list[Book] | Library | BookTable, author: str) -> int:
     """
     Find the total number of pages written by the given author.
 
-    :param library: The list of books to search through.
+    :param library: The list of books, the Library or the BookTable to search through.
     :param author: The given author.
     :return: The total number of pages written by the author.
     """
+    if isinstance(library, BookTable):
+        return library.author_page_count(author)
+    if isinstance(library, Library):
+        return library.author_page_counts.get(author, 0)
     return sum(book.pages for book in library if book.author == author)
 
 
-def most_popular_book(library: list[Book]) -> Book:
+def most_popular_book(library: list[Book] | Library | BookTable) -> Book:
     """
     Find the book with the most sales.
 
-    :param library: The list of books.
+    :param library: The list of books, the Library or the BookTable.
     :return: The Book object with the most sales.
     """
+    if isinstance(library, BookTable):
+        return library.most_popular_book()
+    if isinstance(library, Library):
+        if library.most_popular_book is None:
+            raise ValueError("most_popular_book() arg is an empty library")
+        return library.most_popular_book
     return max(library, key=lambda book: book.sales)
 
 
-def most_popular_author(library: list[Book]) -> str:
+def most_popular_author(library: list[Book] | Library | BookTable) -> str:
     """
     Find the author with the most sales.
 
     If two or more authors have the same amount of sales, it doesn't matter which one is returned.
 
-    :param library: The list of books.
+    :param library: The list of books, the Library or the BookTable.
     :return: The author with the most sales.
     """
+    if isinstance(library, BookTable):
+        return library.most_popular_author()
+    if isinstance(library, Library):
+        if library.most_popular_author is None:
+            raise ValueError("most_popular_author() arg is an empty library")
+        return library.most_popular_author
     sales_by_author = {}
 
     for book in library:
@@ -97,24 +450,39 @@ def most_popular_author(library: list[Book]) -> str:
     return max(sales_by_author, key=sales_by_author.get)
 
 
-def average_author_book_length(library: list[Book], author: str) -> float:
+def average_author_book_length(library: list[Book] | Library | BookTable, author: str) -> float:
     """
     Find the average length of a book (amount of pages), that is written by the given author.
 
-    :param library: The list of books.
+    :param library: The list of books, the Library or the BookTable.
     :param author: The given author.
     :return: The average length of the author's books.
     """
-    return author_page_count(library, author) / author_book_count(library, author)
+    if isinstance(library, BookTable):
+        return library.average_author_book_length(author)
+    if isinstance(library, Library):
+        return author_page_count(library, author) / author_book_count(library, author)
+    pages, number_of_books = 0, 0
+    for book in library:
+        if book.author == author:
+            pages += book.pages
+            number_of_books += 1
+    return pages / number_of_books
 
 
-def find_best_selling_genre(library: list[Book]) -> str:
+def find_best_selling_genre(library: list[Book] | Library | BookTable) -> str:
     """
     Find the genre, that has the most sales. If two or more genres have the same amount of sales, return either one.
 
-    :param library: The list of books.
+    :param library: The list of books, the Library or the BookTable.
     :return: The genre with the most total sales.
     """
+    if isinstance(library, BookTable):
+        return library.find_best_selling_genre()
+    if isinstance(library, Library):
+        if library.best_selling_genre is None:
+            raise ValueError("find_best_selling_genre() arg has no genres")
+        return library.best_selling_genre
     sales_by_genre = {}
     for book in library:
         for genre in book.genres:
@@ -123,7 +491,7 @@ def find_best_selling_genre(library: list[Book]) -> str:
     return max(sales_by_genre, key=sales_by_genre.get)
 
 
-def find_books_by_genre_and_year(library: list[Book], genre: str, year: int) -> list[Book]:
+def find_books_by_genre_and_year(library: list[Book] | Library | BookTable, genre: str, year: int) -> list[Book]:
     """
     Find all books in the given list, that match the given year and genre.
 
@@ -131,33 +499,42 @@ def find_books_by_genre_and_year(library: list[Book], genre: str, year: int) ->
     The result should be sorted by sales (descending) and if two or more books have the same sales,
     then sort them by title (alphabetically).
 
-    :param library: The list of books to search from.
+    :param library: The list of books, the Library or the BookTable to search from.
     :param genre: The genre to search for.
     :param year: The year to search for.
     :return: A list of books, that match the given genre and year, sorted by sales (descending) and title (alphabetically).
     """
-    search_result = []
-    for book in library:
-        if book.year == year and genre in book.genres:
-            search_result.append(book)
+    if isinstance(library, BookTable):
+        return library.find_books_by_genre_and_year(genre, year)
+    if isinstance(library, Library):
+        search_result = library.books_by_genre_and_year.get((genre, year), [])
+    else:
+        search_result = []
+        for book in library:
+            if book.year == year and genre in book.genres:
+                search_result.append(book)
 
-    return sorted(search_result, key=lambda book: (-book.sales, book.title))
+    return sorted(search_result, key=sales_order)
 
 
-def most_popular_author_per_century(library: list[Book]) -> dict[int, str]:
+def most_popular_author_per_century(library: list[Book] | Library | BookTable) -> dict[int, str]:
     """
     Find the author with the most sales for each century.
 
     If two or more authors have the same amount of sales, it doesn't matter which one is returned in the dictionary.
 
-    :param library: The list of books.
+    :param library: The list of books, the Library or the BookTable.
     :return: A dictionary, where the keys are the centuries and the values are the authors with the most sales in that
     century.
     """
+    if isinstance(library, BookTable):
+        return library.most_popular_author_per_century()
+    if isinstance(library, Library):
+        return dict(library.century_leaders)
     sales_by_century = {}
 
     for book in library:
-        century = (book.year - 1) // 100 + 1
+        century = get_century(book.year)
         if century not in sales_by_century:
             sales_by_century[century] = {}
 
@@ -170,6 +547,178 @@ def most_popular_author_per_century(library: list[Book]) -> dict[int, str]:
     }
 
 
+def sales_order(book: Book) -> tuple[int, str]:
+    """
+    Return the sort key that orders books by sales (descending) and title (alphabetically).
+
+    :param book: The book.
+    :return: A tuple of negated sales and title.
+    """
+    return -book.sales, book.title
+
+
+def top_books(library, k: int, condition=None) -> list[Book]:
+    """
+    Find the k books with the most sales, ties sorted by title (alphabetically).
+
+    Only k books are kept in memory at a time, so the library can be any iterable of books, for example a generator
+    reading a file.
+
+    :param library: Any iterable of books, or the BookTable.
+    :param k: The number of books to find.
+    :param condition: If given, only books for which condition(book) is true are considered.
+    :return: A list of at most k books, sorted by sales (descending) and title (alphabetically).
+    """
+    if isinstance(library, BookTable) and condition is None:
+        return library.top_books(k)
+    books = library if condition is None else filter(condition, library)
+    return heapq.nsmallest(k, books, key=sales_order)
+
+
+def top_authors(library, k: int) -> list[tuple[str, int]]:
+    """
+    Find the k authors with the most sales.
+
+    :param library: The Library, the BookTable or any iterable of books.
+    :param k: The number of authors to find.
+    :return: A list of at most k (author, sales) tuples, sorted by sales (descending).
+    """
+    if isinstance(library, BookTable):
+        return library.top_authors(k)
+    if isinstance(library, Library):
+        sales_by_author = library.author_sales
+    else:
+        sales_by_author = {}
+        for book in library:
+            sales_by_author[book.author] = sales_by_author.get(book.author, 0) + book.sales
+    return heapq.nlargest(k, sales_by_author.items(), key=lambda item: item[1])
+
+
+def find_books_by_genre_and_year_page(library, genre: str, year: int, page: int = 1,
+                                      page_size: int = 20) -> list[Book]:
+    """
+    Find one page of the result of find_books_by_genre_and_year.
+
+    Only the books up to the end of the requested page are kept in memory.
+
+    :param library: The Library, the BookTable or any iterable of books.
+    :param genre: The genre to search for.
+    :param year: The year to search for.
+    :param page: The number of the page, starting from 1.
+    :param page_size: The number of books on a page.
+    :return: A list of at most page_size books, sorted by sales (descending) and title (alphabetically).
+    :raises ValueError: If page or page_size is smaller than 1.
+    """
+    if page < 1 or page_size < 1:
+        raise ValueError("Page and page size must be at least 1.")
+    if isinstance(library, BookTable):
+        return library.find_books_by_genre_and_year_page(genre, year, page, page_size)
+    if isinstance(library, Library):
+        books = library.books_by_genre_and_year.get((genre, year), [])
+    else:
+        books = (book for book in library if book.year == year and genre in book.genres)
+    return heapq.nsmallest(page * page_size, books, key=sales_order)[(page - 1) * page_size:]
+
+
+GROUPINGS = {
+    'author': lambda book: (book.author,),
+    'genre': lambda book: book.genres,
+    'century': lambda book: (get_century(book.year),),
+    'year': lambda book: (book.year,),
+}
+OPERATIONS = ('count', 'sum', 'mean', 'argmax')
+FIELDS = ('pages', 'sales', 'year')
+
+
+def aggregate(library: list[Book] | Library | BookTable, specs: list[tuple]) -> dict[tuple, object]:
+    """
+    Compute several group-by aggregates going through the books only once.
+
+    Each spec is a tuple (operation, field, group_by):
+    operation is 'count', 'sum', 'mean' or 'argmax',
+    field is the book attribute to sum ('pages', 'sales' or 'year'), None for 'count',
+    group_by is 'author', 'genre', 'century', 'year', None for the whole library, or a pair such as
+    ('century', 'author') to group by both. A book with several genres counts in each of its genres.
+
+    'count', 'sum' and 'mean' give a dictionary from group to value (a single value if group_by is None).
+    'argmax' gives the group with the largest sum of the field, or for a pair of groupings a dictionary from the first
+    group to the second group with the largest sum within it.
+
+    Example:
+        aggregate(books, [('mean', 'pages', 'author'), ('argmax', 'sales', ('century', 'author'))])
+
+    On a BookTable the groups are computed with array operations, and a genre listed twice for one book counts once.
+
+    :param library: The list of books, the Library or the BookTable.
+    :param specs: The aggregates to compute.
+    :return: A dictionary, where the keys are the specs and the values are their results.
+    :raises ValueError: If a spec has an unknown operation, field or grouping, or 'argmax' has no grouping.
+    """
+    groupings = set()
+    sums_needed = set()
+    for operation, field, group_by in specs:
+        names = () if group_by is None else (group_by,) if isinstance(group_by, str) else group_by
+        if operation not in OPERATIONS or any(name not in GROUPINGS for name in names):
+            raise ValueError(f"Invalid aggregate: {(operation, field, group_by)}")
+        if operation == 'argmax' and not names or len(names) > 2:
+            raise ValueError(f"Invalid aggregate: {(operation, field, group_by)}")
+        if field not in FIELDS and not (operation == 'count' and field is None):
+            raise ValueError(f"Invalid aggregate: {(operation, field, group_by)}")
+        groupings.add(group_by)
+        if operation != 'count':
+            sums_needed.add((field, group_by))
+
+    counts = {group_by: {} for group_by in groupings}
+    sums = {key: {} for key in sums_needed}
+    fields_by_grouping = {group_by: [field for field, grouped in sums_needed if grouped == group_by]
+                          for group_by in groupings}
+    if isinstance(library, BookTable):
+        for group_by in groupings:
+            counts[group_by], group_sums = library.group_totals(group_by, fields_by_grouping[group_by])
+            for field, totals in group_sums.items():
+                sums[field, group_by] = totals
+    else:
+        for book in library:
+            for group_by in groupings:
+                if group_by is None:
+                    keys = (None,)
+                elif isinstance(group_by, str):
+                    keys = GROUPINGS[group_by](book)
+                else:
+                    keys = list(itertools.product(*(GROUPINGS[name](book) for name in group_by)))
+                group_counts = counts[group_by]
+                for key in keys:
+                    group_counts[key] = group_counts.get(key, 0) + 1
+                for field in fields_by_grouping[group_by]:
+                    value = getattr(book, field)
+                    group_sums = sums[field, group_by]
+                    for key in keys:
+                        group_sums[key] = group_sums.get(key, 0) + value
+
+    results = {}
+    for spec in specs:
+        operation, field, group_by = spec
+        if operation == 'count':
+            result = counts[group_by]
+        elif operation == 'sum':
+            result = sums[field, group_by]
+        elif operation == 'mean':
+            result = {key: total / counts[group_by][key] for key, total in sums[field, group_by].items()}
+        elif isinstance(group_by, str):
+            group_sums = sums[field, group_by]
+            result = max(group_sums, key=group_sums.get) if group_sums else None
+        else:
+            best = {}
+            for (first, second), total in sums[field, group_by].items():
+                if first not in best or total > best[first][1]:
+                    best[first] = (second, total)
+            result = {first: second for first, (second, total) in best.items()}
+        if group_by is None and operation != 'argmax':
+            result = result.get(None, 0)
+        results[spec] = dict(result) if isinstance(result, dict) else result
+    return results
+
+
 if __name__ == '__main__':
     book1 = Book("The Great Gatsby", "F. Scott Fitzgerald", 218, 100_000, ["Classic", "Fiction"], 1925)
     book2 = Book("Tender Is the Night", "F. Scott Fitzgerald", 320, 90_000, ["Classic", "Fiction"], 1934)
@@ -200,3 +749,28 @@ if __name__ == '__main__':
                                        1949))  # ["1984" by George Orwell, "Nineteen Eighty-Four" by George Orwell]
     print(most_popular_author_per_century(book_list))  # {19: 'Jane Austen', 20: 'George Orwell', 21: 'Harper Lee'}
     print()
+
+    library = Library(book_list)
+    print(author_book_count(library, "Harper Lee"))  # 3
+    print(most_popular_author(library))  # George Orwell
+    print(find_books_by_genre_and_year(library, "Fiction", 1949))  # same as with the list
+    print(most_popular_author_per_century(library))  # same as with the list
+    print()
+
+    print(aggregate(book_list, [('argmax', 'sales', 'author'), ('argmax', 'sales', 'genre'),
+                                ('argmax', 'sales', ('century', 'author')), ('mean', 'pages', 'author')]))
+    print()
+
+    print(top_books(book_list, 3))  # ["1984" by George Orwell, "The Beautiful and Damned" by F. Scott Fitzgerald, ...]
+    print(top_authors(library, 2))  # [('George Orwell', 365000), ('F. Scott Fitzgerald', 310000)]
+    print(find_books_by_genre_and_year_page(book_list, "Fiction", 1949, page=2, page_size=1))  # ["Nineteen ...]
+    print()
+
+    library.record_sale(book6, 300_000)
+    print(most_popular_book(library))  # "In Cold Blood" by Harper Lee
+    print(most_popular_author(library))  # Harper Lee
+
+    if np is not None:
+        table = BookTable(book_list)
+        print(find_books_by_genre_and_year(table, "Fiction", 1949))  # same as with the list
+        print(most_popular_author_per_century(table))  # same as with the list
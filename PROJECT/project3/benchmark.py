@@ -0,0 +1,183 @@
+"""Benchmark of the VehicleRental hot paths."""
+import argparse
+import datetime
+import json
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+
+from vehicle_rental import Car, Client, Motorcycle, Type, VehicleRental
+
+MAKES = ['Ford', 'Audi', 'BMW', 'Toyota', 'Honda', 'Ducati', 'Yamaha', 'Tesla', 'Volvo', 'Skoda']
+FIRST_DAY = datetime.date(2025, 1, 1).toordinal()
+
+
+def make_fleet(size: int, rng: random.Random) -> list[Car | Motorcycle]:
+    """
+    Generate distinct vehicles.
+
+    :param size: Number of vehicles.
+    :param rng: Random number generator.
+    :return: List of vehicles, about every fifth one is a motorcycle.
+    """
+    types = list(Type)
+    fleet = []
+    for number in range(size):
+        make, year = rng.choice(MAKES), rng.randint(1990, 2025)
+        if rng.random() < 0.2:
+            fleet.append(Motorcycle(make, f"M{number}", year))
+        else:
+            fleet.append(Car(make, f"C{number}", year, rng.choice(types)))
+    return fleet
+
+
+def make_dates(days: int) -> list[str]:
+    """
+    Generate consecutive booking dates.
+
+    :param days: Number of dates.
+    :return: List of "dd.mm.yyyy" dates starting from 01.01.2025.
+    """
+    return [datetime.date.fromordinal(FIRST_DAY + day).strftime("%d.%m.%Y") for day in range(days)]
+
+
+def build_rental(size: int, bookings: int, seed: int) -> tuple:
+    """
+    Build a rental with a synthetic fleet, clients and booking history.
+
+    :param size: Number of vehicles.
+    :param bookings: Number of rents made while building.
+    :param seed: Seed of the random number generator.
+    :return: Tuple of (rental, fleet, clients, dates, rng).
+    """
+    rng = random.Random(seed)
+    fleet = make_fleet(size, rng)
+    clients = [Client(f"client{number}", 10 ** 9) for number in range(max(1, size // 10))]
+    dates = make_dates(365)
+    rental = VehicleRental()
+    rental.add_vehicles(fleet)
+    for _ in range(bookings):
+        rental.rent_vehicle(rng.choice(fleet), rng.choice(dates), rng.choice(clients))
+    return rental, fleet, clients, dates, rng
+
+
+def measure(operation, repeat: int) -> dict:
+    """
+    Run an operation repeatedly and measure each call.
+
+    :param operation: Function without arguments.
+    :param repeat: Number of calls.
+    :return: Dictionary with ops per second and latency percentiles in microseconds.
+    """
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        operation()
+        latencies.append(time.perf_counter_ns() - start)
+    latencies.sort()
+    total = sum(latencies) or 1
+
+    def percentile(share: float) -> float:
+        """Return the latency below which the given share of the calls finished, in microseconds."""
+        return latencies[min(len(latencies) - 1, int(share * len(latencies)))] / 1000
+
+    return {
+        'calls': repeat,
+        'ops_per_sec': repeat / total * 1e9,
+        'mean_us': statistics.fmean(latencies) / 1000,
+        'p50_us': percentile(0.50),
+        'p90_us': percentile(0.90),
+        'p99_us': percentile(0.99),
+        'max_us': latencies[-1] / 1000,
+    }
+
+
+def run(size: int, repeat: int, seed: int) -> dict:
+    """
+    Benchmark every operation on a rental of the given size.
+
+    Operations whose cost grows with the fleet are called fewer times on large fleets. Tracing allocations slows
+    Python down, so the peak memory is measured on a second, identical build that is not timed.
+
+    :param size: Number of vehicles.
+    :param repeat: Number of calls of each cheap operation.
+    :param seed: Seed of the random number generator.
+    :return: Dictionary with build time, peak memory and results of each operation.
+    """
+    start = time.perf_counter()
+    rental, fleet, clients, dates, rng = build_rental(size, size, seed)
+    build_seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    build_rental(size, size, seed)
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    full_scan_repeat = max(1, min(repeat, 10_000_000 // size))
+    operations = {
+        'rent_vehicle': (lambda: rental.rent_vehicle(rng.choice(fleet), rng.choice(dates), rng.choice(clients)),
+                         repeat),
+        'is_vehicle_available': (lambda: rental.is_vehicle_available(rng.choice(fleet), rng.choice(dates)), repeat),
+        'get_best_client': (rental.get_best_client, repeat),
+        'find_vehicle_by_make': (lambda: rental.find_vehicle_by_make(rng.choice(MAKES)), full_scan_repeat),
+        'get_sorted_vehicles_list': (rental.get_sorted_vehicles_list, full_scan_repeat),
+    }
+    return {
+        'size': size,
+        'build_seconds': build_seconds,
+        'peak_memory_bytes': peak_memory,
+        'operations': {name: measure(operation, calls) for name, (operation, calls) in operations.items()},
+    }
+
+
+def compare(old: dict, new: dict) -> None:
+    """
+    Print the change in ops per second of every operation between two result files.
+
+    :param old: Earlier benchmark results.
+    :param new: Current benchmark results.
+    """
+    old_runs = {result['size']: result for result in old['results']}
+    for result in new['results']:
+        old_result = old_runs.get(result['size'])
+        if old_result is None:
+            continue
+        for name, stats in result['operations'].items():
+            if name in old_result['operations']:
+                ratio = stats['ops_per_sec'] / old_result['operations'][name]['ops_per_sec']
+                print(f"{result['size']:>10} {name:<26} {ratio:6.2f}x")
+
+
+def main() -> None:
+    """Parse arguments, run the benchmark, print and save the results."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+                        help="fleet sizes to benchmark (1000 to 10000000)")
+    parser.add_argument('--repeat', type=int, default=10_000, help="calls of each operation")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic data")
+    parser.add_argument('--output', default='bench_output.json', help="file the JSON results are saved to")
+    parser.add_argument('--compare', help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        result = run(size, args.repeat, args.seed)
+        results.append(result)
+        peak_mib = result['peak_memory_bytes'] / 2 ** 20
+        print(f"size {size}: built in {result['build_seconds']:.2f} s, peak {peak_mib:.1f} MiB")
+        for name, stats in result['operations'].items():
+            print(f"  {name:<26} {stats['ops_per_sec']:>14,.0f} ops/s  p50 {stats['p50_us']:>10.1f} us"
+                  f"  p99 {stats['p99_us']:>10.1f} us")
+
+    report = {'python': platform.python_version(), 'seed': args.seed, 'repeat': args.repeat, 'results': results}
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            compare(json.load(file), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,22 @@
 """Vehicle rental. Project III."""
+import array
+import asyncio
+import bisect
+import collections.abc
+import contextlib
+import csv
+import datetime
 import enum
+import functools
+import itertools
+import json
+import pickle
+import struct
+import sys
+import threading
+import uuid
+
+DATE_FORMAT = "%d.%m.%Y"
 
 
 class Type(enum.Enum):
@@ -30,21 +47,312 @@ def get_price(vehicle) -> int:
 
     :return: Price of the vehicle based on its type.
     """
-    if isinstance(vehicle, Motorcycle):
-        return 100
-    elif isinstance(vehicle, Car):
-        if vehicle.type_of_car == Type.SPORTSCAR:
-            return 200
-        if vehicle.type_of_car == Type.CONVERTIBLE:
-            return 150
-        if vehicle.type_of_car == Type.VAN:
-            return 100
+    return PRICES.get(vehicle.price_key, PRICES[Type.OTHER])
+
+
+MOTORCYCLE = 'MOTORCYCLE'
+PRICES = {
+    MOTORCYCLE: 100,
+    Type.OTHER: 50,
+    Type.VAN: 100,
+    Type.CONVERTIBLE: 150,
+    Type.SPORTSCAR: 200,
+}
+
+
+@functools.lru_cache(maxsize=4096)
+def date_to_ordinal(date: str | datetime.date) -> int:
+    """
+    Convert a date into a day ordinal, the canonical form of dates in the rental.
+
+    Results are cached, so every distinct date string is parsed only once.
+
+    :param date: Date string in "dd.mm.yyyy" format (day and month may have one digit) or a datetime.date.
+    :return: Proleptic Gregorian ordinal of the date.
+    :raises ValueError: If the date is not a valid "dd.mm.yyyy" date.
+    """
+    if isinstance(date, datetime.date):
+        return date.toordinal()
+    return datetime.datetime.strptime(date, DATE_FORMAT).date().toordinal()
+
+
+@functools.lru_cache(maxsize=4096)
+def ordinal_to_date(day: int) -> str:
+    """
+    Convert a day ordinal back into a canonical "dd.mm.yyyy" date string.
+
+    :param day: Proleptic Gregorian ordinal of the date.
+    :return: Date string in "dd.mm.yyyy" format.
+    """
+    return datetime.date.fromordinal(day).strftime(DATE_FORMAT)
+
+
+def canonical_date(date: str | datetime.date) -> str:
+    """
+    Return the canonical "dd.mm.yyyy" form of a date, for example "1.1.2025" becomes "01.01.2025".
+
+    :param date: Date string in "dd.mm.yyyy" format or a datetime.date.
+    :return: Zero padded "dd.mm.yyyy" date string.
+    :raises ValueError: If the date is not a valid "dd.mm.yyyy" date.
+    """
+    return ordinal_to_date(date_to_ordinal(date))
+
+
+def date_range(start_date: str, end_date: str) -> range:
+    """
+    Return the day ordinals from start_date to end_date.
+
+    :param start_date: The first date of the range (inclusive).
+    :param end_date: The last date of the range (inclusive).
+    :return: Range of day ordinals, empty if start_date is after end_date.
+    :raises ValueError: If either date is not a valid "dd.mm.yyyy" date.
+    """
+    return range(date_to_ordinal(start_date), date_to_ordinal(end_date) + 1)
+
+
+class PricingEngine:
+    """
+    Price lookup for vehicles with optional date based rules.
+
+    Prices are looked up by the price key of a vehicle (Type of a car or MOTORCYCLE). Rules are compiled into a
+    (price key, day) -> price table when they are added, so pricing a booking day is a dictionary lookup.
+    """
+
+    def __init__(self, prices: dict = None) -> None:
+        """
+        Construct new PricingEngine.
+
+        :param prices: Price for each price key, PRICES is used if not given.
+        """
+        self.prices = dict(PRICES if prices is None else prices)
+        self.multipliers = {}
+        self.day_prices = {}
+
+    def base_price(self, vehicle) -> int:
+        """
+        Return the price of the vehicle without any date rules.
+
+        :param vehicle: A vehicle object (either Car or Motorcycle).
+        :return: Price of the vehicle based on its type.
+        """
+        return self.prices.get(vehicle.price_key, self.prices[Type.OTHER])
+
+    def price(self, vehicle, day: int) -> int:
+        """
+        Return the price of the vehicle for one day.
+
+        :param vehicle: A vehicle object (either Car or Motorcycle).
+        :param day: Day ordinal of the booking.
+        :return: Price of the vehicle on that day.
+        """
+        price = self.day_prices.get((vehicle.price_key, day))
+        return self.base_price(vehicle) if price is None else price
+
+    def add_rule(self, start_date: str, end_date: str, multiplier: float, price_key=None) -> None:
+        """
+        Multiply prices for every date from start_date to end_date.
+
+        Rules covering the same day are multiplied together. Prices are rounded to whole numbers.
+
+        :param start_date: The first date of the rule (inclusive).
+        :param end_date: The last date of the rule (inclusive).
+        :param multiplier: Multiplier applied to the base price.
+        :param price_key: If given, the rule applies only to vehicles with this price key, otherwise to all.
+        :raises ValueError: If the dates are not valid "dd.mm.yyyy" dates or the multiplier is negative.
+        """
+        if multiplier < 0:
+            raise ValueError("Multiplier must not be negative.")
+        price_keys = list(self.prices) if price_key is None else [price_key]
+        for day in date_range(start_date, end_date):
+            for key in price_keys:
+                self.multipliers[key, day] = self.multipliers.get((key, day), 1) * multiplier
+                self.day_prices[key, day] = round(self.prices[key] * self.multipliers[key, day])
+
+
+class BookingCalendar:
+    """
+    Booked days of a single vehicle.
+
+    Days are kept both in a dictionary of day -> (client, price) (for O(1) single day checks) and in a sorted list
+    of ordinals (for O(log n) range checks). The calendar also keeps the list of booked date strings of the vehicle
+    in booking order, with the position of every day in it, so a cancelled date is removed by moving the last date
+    into its place.
+    """
+
+    def __init__(self, dates: list[str] = None) -> None:
+        """
+        Construct new empty calendar.
+
+        :param dates: List the booked date strings are kept in, a new one is used if not given.
+        """
+        self.days = []
+        self.booked = {}
+        self.dates = [] if dates is None else dates
+        self.positions = {}
+
+    def __len__(self) -> int:
+        """:return: number of booked days."""
+        return len(self.days)
+
+    def __iter__(self):
+        """:return: iterator over booked day ordinals in ascending order."""
+        return iter(self.days)
+
+    def is_free(self, day: int) -> bool:
+        """
+        Check if the day is not booked.
+
+        :param day: Day ordinal.
+        :return: True if the day is free, otherwise False.
+        """
+        return day not in self.booked
+
+    def is_free_range(self, start: int, end: int) -> bool:
+        """
+        Check if no day in the inclusive range start..end is booked.
+
+        :param start: First day ordinal of the range.
+        :param end: Last day ordinal of the range.
+        :return: True if every day of the range is free, otherwise False.
+        """
+        index = bisect.bisect_left(self.days, start)
+        return index == len(self.days) or self.days[index] > end
+
+    def book(self, day: int, client, price: int) -> None:
+        """
+        Mark the day as booked.
+
+        :param day: Day ordinal.
+        :param client: Client who booked the day.
+        :param price: Price paid for the day.
+        """
+        bisect.insort(self.days, day)
+        self.booked[day] = (client, price)
+        self.positions[day] = len(self.dates)
+        self.dates.append(ordinal_to_date(day))
+
+    def cancel(self, day: int) -> tuple:
+        """
+        Mark a booked day as free.
+
+        :param day: Day ordinal of a booked day.
+        :return: (client, price) of the cancelled booking.
+        """
+        del self.days[bisect.bisect_left(self.days, day)]
+        position = self.positions.pop(day)
+        last_date = self.dates.pop()
+        if position < len(self.dates):
+            self.dates[position] = last_date
+            self.positions[date_to_ordinal(last_date)] = position
+        return self.booked.pop(day)
+
+
+class Leaderboard:
+    """
+    Items ordered by a score, highest score first.
+
+    Entries are kept sorted in blocks of at most 2 * LOAD entries, with the last entry of every block in a separate
+    list. An update finds the block by binary search and shifts at most one block and the short list of blocks, so
+    its cost does not grow with the number of items the way a single sorted list does. Reading the top k items walks
+    the first blocks. Items with equal scores keep the order in which they were first added.
+    """
+
+    LOAD = 512
+
+    def __init__(self) -> None:
+        """Construct new empty leaderboard."""
+        self.blocks = []
+        self.maxes = []
+        self.keys = {}
+
+    def __len__(self) -> int:
+        """:return: number of items on the leaderboard."""
+        return len(self.keys)
+
+    def __iter__(self):
+        """:return: iterator over the items, highest score first."""
+        return (entry[-1] for block in self.blocks for entry in block)
+
+    def update(self, item, score: tuple) -> None:
+        """
+        Add the item to the leaderboard or change its score.
+
+        :param item: Hashable item to rank.
+        :param score: Tuple of numbers, compared lexicographically, higher is better.
+        """
+        old_entry = self.keys.get(item)
+        if old_entry is None:
+            order = len(self.keys)
         else:
-            return 50
+            order = old_entry[-2]
+            self._remove(old_entry)
+        entry = (*(-value for value in score), order, item)
+        self._insert(entry)
+        self.keys[item] = entry
+
+    def top(self, n: int) -> list:
+        """
+        Return the n items with the highest score.
+
+        :param n: Number of items to return.
+        :return: List of at most n items, highest score first.
+        """
+        return list(itertools.islice(self, max(n, 0)))
+
+    def _insert(self, entry: tuple) -> None:
+        """
+        Insert an entry into its block, splitting the block if it gets too long.
+
+        :param entry: Entry to insert.
+        """
+        if not self.blocks:
+            self.blocks.append([entry])
+            self.maxes.append(entry)
+            return
+        index = min(bisect.bisect_left(self.maxes, entry), len(self.maxes) - 1)
+        block = self.blocks[index]
+        bisect.insort(block, entry)
+        self.maxes[index] = block[-1]
+        if len(block) > 2 * self.LOAD:
+            self.blocks.insert(index + 1, block[self.LOAD:])
+            del block[self.LOAD:]
+            self.maxes[index] = block[-1]
+            self.maxes.insert(index + 1, self.blocks[index + 1][-1])
+
+    def _remove(self, entry: tuple) -> None:
+        """
+        Remove an entry from its block, dropping the block if it gets empty.
+
+        :param entry: Entry on the leaderboard.
+        """
+        index = bisect.bisect_left(self.maxes, entry)
+        block = self.blocks[index]
+        del block[bisect.bisect_left(block, entry)]
+        if block:
+            self.maxes[index] = block[-1]
+        else:
+            del self.blocks[index]
+            del self.maxes[index]
+
+
+def intern_name(name):
+    """
+    Intern a make or model string so equal names share one object.
+
+    :param name: Name to intern, anything else than a str is returned unchanged.
+    :return: The interned name.
+    """
+    return sys.intern(name) if type(name) is str else name
 
 
 class Car:
-    """Car class representing a vehicle of type Car."""
+    """
+    Car class representing a vehicle of type Car.
+
+    Cars are immutable, so the hash is computed once in the constructor.
+    """
+
+    __slots__ = ('make', 'model', 'year', 'type_of_car', 'price_key', 'hash')
 
     def __init__(self, make: str, model: str, year: int, type_of_car: Type) -> None:
         """
@@ -56,10 +364,25 @@ class Car:
         :param type_of_car: Type of the car (an instance of Type enum).
         :raises ValueError: If type_of_car is not an instance of Type enum.
         """
-        self.make = make
-        self.model = model
-        self.year = year
-        self.type_of_car = type_of_car
+        make, model = intern_name(make), intern_name(model)
+        object.__setattr__(self, 'make', make)
+        object.__setattr__(self, 'model', model)
+        object.__setattr__(self, 'year', year)
+        object.__setattr__(self, 'type_of_car', type_of_car)
+        object.__setattr__(self, 'price_key', type_of_car)
+        object.__setattr__(self, 'hash', hash((make, model, year, type_of_car)))
+
+    def __setattr__(self, name, value):
+        """Forbid changing the car."""
+        raise AttributeError("Car is immutable.")
+
+    def __delattr__(self, name):
+        """Forbid changing the car."""
+        raise AttributeError("Car is immutable.")
+
+    def __reduce__(self):
+        """Pickle the car by its constructor arguments."""
+        return Car, (self.make, self.model, self.year, self.type_of_car)
 
     def __repr__(self) -> str:
         """
@@ -75,11 +398,12 @@ class Car:
 
         return: hash(make, model, year, type_of_car)
         """
-        return hash((self.make, self.model, self.year, self.type_of_car))
+        return self.hash
 
     def __eq__(self, other):
         """Compare two cars."""
-        return isinstance(other, Car) and (self.make, self.model, self.year, self.type_of_car) == \
+        return self is other or isinstance(other, Car) and self.hash == other.hash and \
+            (self.make, self.model, self.year, self.type_of_car) == \
             (other.make, other.model, other.year, other.type_of_car)
 
     def get_price(self) -> int:
@@ -88,7 +412,13 @@ class Car:
 
 
 class Motorcycle:
-    """Motorcycle."""
+    """
+    Motorcycle.
+
+    Motorcycles are immutable, so the hash is computed once in the constructor.
+    """
+
+    __slots__ = ('make', 'model', 'year', 'price_key', 'hash')
 
     def __init__(self, make: str, model: str, year: int) -> None:
         """
@@ -98,9 +428,24 @@ class Motorcycle:
         :param model: Model of the motorcycle.
         :param year: Year the motorcycle was manufactured.
         """
-        self.make = make
-        self.model = model
-        self.year = year
+        make, model = intern_name(make), intern_name(model)
+        object.__setattr__(self, 'make', make)
+        object.__setattr__(self, 'model', model)
+        object.__setattr__(self, 'year', year)
+        object.__setattr__(self, 'price_key', MOTORCYCLE)
+        object.__setattr__(self, 'hash', hash((make, model, year)))
+
+    def __setattr__(self, name, value):
+        """Forbid changing the motorcycle."""
+        raise AttributeError("Motorcycle is immutable.")
+
+    def __delattr__(self, name):
+        """Forbid changing the motorcycle."""
+        raise AttributeError("Motorcycle is immutable.")
+
+    def __reduce__(self):
+        """Pickle the motorcycle by its constructor arguments."""
+        return Motorcycle, (self.make, self.model, self.year)
 
     def __repr__(self) -> str:
         """
@@ -116,32 +461,117 @@ class Motorcycle:
 
         return: hash(make, model, year)
         """
-        return hash((self.make, self.model, self.year))
+        return self.hash
 
     def __eq__(self, other):
         """Compare two motorcycles."""
-        return isinstance(other, Motorcycle) and (self.make, self.model, self.year) == \
-            (other.make, other.model, other.year)
+        return self is other or isinstance(other, Motorcycle) and self.hash == other.hash and \
+            (self.make, self.model, self.year) == (other.make, other.model, other.year)
 
     def get_price(self) -> int:
         """:return: price of the vehicle."""
         return get_price(self)
 
 
+class ClientBookings(collections.abc.Sequence):
+    """
+    Read-only view of the bookings of a client.
+
+    Items are created only when they are read, either (vehicle, date) tuples or just the vehicles.
+    """
+
+    def __init__(self, client, with_dates: bool) -> None:
+        """
+        Construct new view.
+
+        :param client: Client whose bookings are viewed.
+        :param with_dates: If True, items are (vehicle, date) tuples, otherwise vehicles.
+        """
+        self.client = client
+        self.with_dates = with_dates
+
+    def __len__(self) -> int:
+        """:return: number of bookings."""
+        return len(self.client.booked_days)
+
+    def __getitem__(self, index):
+        """Return the booking at the index, or a list of bookings for a slice."""
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        vehicle = self.client.vehicles[self.client.booked_vehicles[index]]
+        if self.with_dates:
+            return vehicle, ordinal_to_date(self.client.booked_days[index])
+        return vehicle
+
+    def __eq__(self, other) -> bool:
+        """Compare the bookings with another sequence item by item."""
+        if not isinstance(other, collections.abc.Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(mine == theirs for mine, theirs in zip(self, other))
+
+    def __repr__(self) -> str:
+        """Return string representation of the bookings, like a list."""
+        return repr(list(self))
+
+
 class Client:
-    """Client class representing a client of the rental service."""
+    """
+    Client class representing a client of the rental service.
+
+    Bookings are stored as parallel arrays of rental index, vehicle index, day ordinal and price paid, where the
+    indexes point into the lists of distinct rentals (by rental id) and vehicles the client has booked from. The
+    position of every booking is indexed by (rental index, vehicle index, day), so a cancelled booking is removed by
+    moving the last booking into its place.
+    """
+
+    __slots__ = ('client_id', 'name', 'budget', 'spent', 'rental_ids', 'rental_indexes', 'vehicles',
+                 'vehicle_indexes', 'booked_rentals', 'booked_vehicles', 'booked_days', 'booked_prices', 'positions')
+    ids = itertools.count(1)
+    id_lock = threading.Lock()
 
-    def __init__(self, name: str, budget: int) -> None:
+    def __init__(self, name: str, budget: int, client_id: int = None) -> None:
         """
         Construct new Client.
 
         :param name: The name of the client.
         :param budget: The initial budget for the client.
-        bookings: A list of vehicles that the client has booked.
+        :param client_id: Stable identifier of the client, a new unique one is generated if not given. Ids generated
+         later are always larger than a given id.
+        spent: The total amount of money the client has spent on bookings.
         """
+        if client_id is None:
+            with Client.id_lock:
+                client_id = next(Client.ids)
+        else:
+            Client.reserve_id(client_id)
+        self.client_id = client_id
         self.name = name
         self.budget = budget
-        self.bookings = []
+        self.spent = 0
+        self.rental_ids = []
+        self.rental_indexes = {}
+        self.vehicles = []
+        self.vehicle_indexes = {}
+        self.booked_rentals = array.array('I')
+        self.booked_vehicles = array.array('I')
+        self.booked_days = array.array('i')
+        self.booked_prices = array.array('q')
+        self.positions = {}
+
+    @classmethod
+    def reserve_id(cls, client_id: int) -> None:
+        """
+        Make sure ids generated from now on are larger than the given id.
+
+        :param client_id: Id of an existing client.
+        """
+        with cls.id_lock:
+            cls.ids = itertools.count(max(client_id + 1, next(cls.ids)))
+
+    @property
+    def bookings(self) -> ClientBookings:
+        """:return: view of (vehicle, date) tuples of all the bookings of the client."""
+        return ClientBookings(self, True)
 
     def book_vehicle(self, vehicle: Car | Motorcycle, date: str, vehicle_rental) -> bool:
         """
@@ -152,33 +582,448 @@ class Client:
         :param vehicle_rental: The rental service from which the vehicle is being booked.
         :return: True if the booking is successful, otherwise False.
         """
-        if vehicle_rental.rent_vehicle(vehicle, date, self):
-            self.bookings.append((vehicle, date))
-            return True
-        return False
+        return vehicle_rental.rent_vehicle(vehicle, date, self)
+
+    def book_vehicle_range(self, vehicle: Car | Motorcycle, start_date: str, end_date: str, vehicle_rental) -> bool:
+        """
+        Book a vehicle for every date from start_date to end_date.
+
+        Either all the dates are booked or none of them.
+
+        :param vehicle: The vehicle to be booked.
+        :param start_date: The first date of the booking (inclusive).
+        :param end_date: The last date of the booking (inclusive).
+        :param vehicle_rental: The rental service from which the vehicle is being booked.
+        :return: True if the booking is successful, otherwise False.
+        """
+        return vehicle_rental.rent_vehicle_range(vehicle, start_date, end_date, self)
+
+    def cancel_booking(self, vehicle: Car | Motorcycle, date: str, vehicle_rental) -> bool:
+        """
+        Cancel a booking of the client and get the money back.
+
+        :param vehicle: The booked vehicle.
+        :param date: The booked date.
+        :param vehicle_rental: The rental service the vehicle was booked from.
+        :return: True if the booking was cancelled, otherwise False.
+        :raises ValueError: If another client with the same id is registered in the rental.
+        """
+        return vehicle_rental.cancel_booking(vehicle, date, self)
+
+    def add_booking(self, vehicle: Car | Motorcycle, day: int, price: int, rental_id: int) -> None:
+        """
+        Record a booking made by the rental service for the client.
+
+        :param vehicle: The booked vehicle.
+        :param day: Day ordinal of the booked date.
+        :param price: The price paid for the booking.
+        :param rental_id: Id of the rental the booking was made in.
+        """
+        rental_index = self.rental_indexes.get(rental_id)
+        if rental_index is None:
+            rental_index = self.rental_indexes[rental_id] = len(self.rental_ids)
+            self.rental_ids.append(rental_id)
+        vehicle_index = self.vehicle_indexes.get(vehicle)
+        if vehicle_index is None:
+            vehicle_index = self.vehicle_indexes[vehicle] = len(self.vehicles)
+            self.vehicles.append(vehicle)
+        self.positions[rental_index, vehicle_index, day] = len(self.booked_days)
+        self.booked_rentals.append(rental_index)
+        self.booked_vehicles.append(vehicle_index)
+        self.booked_days.append(day)
+        self.booked_prices.append(price)
+        self.spent += price
+
+    def remove_booking(self, vehicle: Car | Motorcycle, day: int, price: int, rental_id: int) -> bool:
+        """
+        Remove a cancelled booking and get its price back.
+
+        :param vehicle: The booked vehicle.
+        :param day: Day ordinal of the booked date.
+        :param price: The price refunded, as taken from the balance of the rental.
+        :param rental_id: Id of the rental the booking was made in.
+        :return: True if the booking was removed, False if the client has no such booking.
+        """
+        key = (self.rental_indexes.get(rental_id), self.vehicle_indexes.get(vehicle), day)
+        position = self.positions.pop(key, None)
+        if position is None:
+            return False
+        last = len(self.booked_days) - 1
+        if position < last:
+            moved = (self.booked_rentals[last], self.booked_vehicles[last], self.booked_days[last])
+            self.booked_rentals[position], self.booked_vehicles[position], self.booked_days[position] = moved
+            self.booked_prices[position] = self.booked_prices[last]
+            self.positions[moved] = position
+        self.booked_rentals.pop()
+        self.booked_vehicles.pop()
+        self.booked_days.pop()
+        self.booked_prices.pop()
+        self.spent -= price
+        self.budget += price
+        return True
 
     def total_spent(self) -> int:
         """
-        Calculate and return the total amount spent by the client.
+        Return the total amount spent by the client.
 
         :return: The total amount of money the client has spent on successful bookings.
         """
-        return sum(get_price(vehicle) for vehicle, date in self.bookings)
+        return self.spent
 
-    def get_bookings(self) -> list[Car | Motorcycle]:
-        """:return: List of all the vehicles client has booked."""
-        return [vehicle for vehicle, date in self.bookings]
+    def get_bookings(self) -> ClientBookings:
+        """:return: View of all the vehicles client has booked."""
+        return ClientBookings(self, False)
 
 
-class VehicleRental:
-    """Vehicle rental system managing vehicles, rents and budget."""
+class BookingRequest:
+    """A request to rent some vehicle for a date range, used by VehicleRental.allocate."""
+
+    def __init__(self, client: Client, start_date: str, end_date: str, types: list = None, makes: list[str] = None,
+                 budget: int = None) -> None:
+        """
+        Construct new BookingRequest.
+
+        :param client: Client who wants to rent a vehicle.
+        :param start_date: The first date of the rental (inclusive).
+        :param end_date: The last date of the rental (inclusive).
+        :param types: Acceptable Types (and MOTORCYCLE), any vehicle is acceptable if not given.
+        :param makes: Acceptable manufacturers (case-insensitive), any make is acceptable if not given.
+        :param budget: Most the client is willing to pay for this rental, the budget of the client if not given.
+        """
+        self.client = client
+        self.start_date = start_date
+        self.end_date = end_date
+        self.types = types
+        self.makes = None if makes is None else {make.casefold() for make in makes}
+        self.budget = budget
+
+    def __repr__(self) -> str:
+        """Return string representation of the request."""
+        return f"BookingRequest({self.client.name}, {self.start_date}, {self.end_date})"
+
+
+class FleetColumns:
+    """
+    Columnar copy of a fleet for aggregate queries.
+
+    Every vehicle is a row; its year, price key code, make id, rental count and revenue are stored in parallel
+    arrays, so aggregates loop over plain numbers instead of vehicle objects.
+    """
 
     def __init__(self) -> None:
-        """Construct new VehicleRental."""
+        """Construct new empty FleetColumns."""
+        self.rows = {}
+        self.years = array.array('i')
+        self.type_codes = array.array('B')
+        self.make_ids = array.array('I')
+        self.rental_counts = array.array('I')
+        self.revenues = array.array('Q')
+        self.price_keys = []
+        self.type_codes_by_key = {}
+        self.makes = []
+        self.make_ids_by_name = {}
+
+    def __len__(self) -> int:
+        """:return: number of vehicles (rows)."""
+        return len(self.years)
+
+    def add(self, vehicle: Car | Motorcycle) -> None:
+        """
+        Add a row for the vehicle.
+
+        :param vehicle: Vehicle (Car or Motorcycle) to be added.
+        """
+        if vehicle.price_key not in self.type_codes_by_key:
+            self.type_codes_by_key[vehicle.price_key] = len(self.price_keys)
+            self.price_keys.append(vehicle.price_key)
+        make = vehicle.make.casefold()
+        if make not in self.make_ids_by_name:
+            self.make_ids_by_name[make] = len(self.makes)
+            self.makes.append(vehicle.make)
+        self.rows[vehicle] = len(self.years)
+        self.years.append(vehicle.year)
+        self.type_codes.append(self.type_codes_by_key[vehicle.price_key])
+        self.make_ids.append(self.make_ids_by_name[make])
+        self.rental_counts.append(0)
+        self.revenues.append(0)
+
+    def record_rental(self, vehicle: Car | Motorcycle, days: int, revenue: int) -> None:
+        """
+        Add a rental to the row of the vehicle, negative values remove a cancelled rental.
+
+        :param vehicle: Rented vehicle.
+        :param days: Number of days the vehicle was rented for.
+        :param revenue: Money paid for the rental.
+        """
+        row = self.rows[vehicle]
+        self.rental_counts[row] += days
+        self.revenues[row] += revenue
+
+    def revenue_by_type(self) -> dict:
+        """:return: dictionary with price keys (Type or MOTORCYCLE) as keys and total revenue as values."""
+        totals = [0] * len(self.price_keys)
+        for code, revenue in zip(self.type_codes, self.revenues):
+            totals[code] += revenue
+        return dict(zip(self.price_keys, totals))
+
+    def rentals_by_year_bucket(self, bucket_size: int = 10) -> dict[int, int]:
+        """
+        Count rentals of vehicles grouped by manufacturing year.
+
+        :param bucket_size: Number of years in one bucket.
+        :return: dictionary with the first year of each bucket as keys and rental counts as values.
+        :raises ValueError: If bucket_size is not positive.
+        """
+        if bucket_size < 1:
+            raise ValueError("Bucket size must be positive.")
+        totals = {}
+        for year, count in zip(self.years, self.rental_counts):
+            bucket = year - year % bucket_size
+            totals[bucket] = totals.get(bucket, 0) + count
+        return dict(sorted(totals.items()))
+
+    def utilisation_per_make(self, days: int) -> dict[str, float]:
+        """
+        Return the lifetime booking rate of each make over a period of the given length.
+
+        Rental counts are kept for all time, not per date, so every booked day ever made is counted. The result is the
+        share of booked vehicle days only if all the bookings fall inside a period of that many days, for dated
+        shares use VehicleRental.get_utilisation_report.
+
+        :param days: Length of the period in days.
+        :return: dictionary with makes as keys and all booked days divided by (number of vehicles * days) as values.
+        :raises ValueError: If days is not positive.
+        """
+        if days < 1:
+            raise ValueError("Period must be at least one day.")
+        vehicle_counts = [0] * len(self.makes)
+        rentals = [0] * len(self.makes)
+        for make_id, count in zip(self.make_ids, self.rental_counts):
+            vehicle_counts[make_id] += 1
+            rentals[make_id] += count
+        return {make: rentals[make_id] / (vehicle_counts[make_id] * days) for make_id, make in enumerate(self.makes)}
+
+
+class BookingJournal:
+    """
+    Append-only journal of the changes made to a VehicleRental.
+
+    Bookings and cancellations are written as fixed size binary records (vehicle id, day ordinal, client id, price).
+    Added vehicles and newly registered clients are written as length prefixed pickles, so a rental can be rebuilt
+    from the journal alone or from a snapshot plus the part of the journal written after it.
+    """
+
+    BOOKING = b'B'
+    CANCELLATION = b'X'
+    VEHICLE = b'V'
+    CLIENT = b'C'
+    BOOKING_RECORD = struct.Struct('<ciiqq')
+    PAYLOAD_HEADER = struct.Struct('<ci')
+
+    def __init__(self, path: str) -> None:
+        """
+        Open the journal for appending.
+
+        :param path: Path of the journal file, created if missing.
+        """
+        self.path = path
+        self.file = open(path, 'ab')
+        self.lock = threading.Lock()
+
+    def position(self) -> int:
+        """:return: number of bytes written to the journal."""
+        with self.lock:
+            self.file.flush()
+            return self.file.tell()
+
+    def write_vehicle(self, vehicle_id: int, vehicle: Car | Motorcycle) -> None:
+        """
+        Write an added vehicle.
+
+        :param vehicle_id: Id of the vehicle in the rental.
+        :param vehicle: The added vehicle.
+        """
+        self._write_payload(self.VEHICLE, (vehicle_id, vehicle))
+
+    def write_client(self, client: Client) -> None:
+        """
+        Write a client before their first booking.
+
+        :param client: The client, with the budget they had before the booking.
+        """
+        self._write_payload(self.CLIENT, (client.client_id, client.name, client.budget))
+
+    def write_bookings(self, vehicle_id: int, days: list[int], client_id: int, prices: list[int]) -> None:
+        """
+        Write the booked days of one rent.
+
+        :param vehicle_id: Id of the rented vehicle in the rental.
+        :param days: Booked day ordinals.
+        :param client_id: Id of the client.
+        :param prices: Price paid for each day.
+        """
+        records = b''.join(
+            self.BOOKING_RECORD.pack(self.BOOKING, vehicle_id, day, client_id, price)
+            for day, price in zip(days, prices)
+        )
+        with self.lock:
+            self.file.write(records)
+            self.file.flush()
+
+    def write_cancellation(self, vehicle_id: int, day: int, client_id: int, price: int) -> None:
+        """
+        Write a cancelled booking.
+
+        :param vehicle_id: Id of the vehicle in the rental.
+        :param day: Day ordinal of the cancelled booking.
+        :param client_id: Id of the client.
+        :param price: Price refunded to the client.
+        """
+        with self.lock:
+            self.file.write(self.BOOKING_RECORD.pack(self.CANCELLATION, vehicle_id, day, client_id, price))
+            self.file.flush()
+
+    def _write_payload(self, kind: bytes, payload) -> None:
+        """
+        Write a length prefixed pickled record.
+
+        :param kind: Record kind.
+        :param payload: Object to pickle.
+        """
+        data = pickle.dumps(payload)
+        with self.lock:
+            self.file.write(self.PAYLOAD_HEADER.pack(kind, len(data)) + data)
+            self.file.flush()
+
+    def close(self) -> None:
+        """Close the journal file."""
+        with self.lock:
+            self.file.close()
+
+    @classmethod
+    def read(cls, path: str, offset: int = 0):
+        """
+        Read records from the journal.
+
+        Reading stops at an incomplete record at the end of the file, left by a crash during a write.
+
+        :param path: Path of the journal file.
+        :param offset: Position to start reading from.
+        :return: Iterator of (kind, fields) tuples, fields is a tuple of booking fields or the unpickled payload.
+        """
+        with open(path, 'rb') as file:
+            file.seek(offset)
+            for kind, data in cls._scan(file):
+                if kind in (cls.BOOKING, cls.CANCELLATION):
+                    yield kind, cls.BOOKING_RECORD.unpack(data)[1:]
+                else:
+                    yield kind, pickle.loads(data)
+
+    @classmethod
+    def repair(cls, path: str, offset: int = 0) -> int:
+        """
+        Cut off an incomplete record at the end of the journal, so new records are not appended after it.
+
+        :param path: Path of the journal file.
+        :param offset: Position of a record to start checking from.
+        :return: Length of the journal after the repair.
+        """
+        with open(path, 'r+b') as file:
+            file.seek(offset)
+            end = offset
+            for _ in cls._scan(file):
+                end = file.tell()
+            file.truncate(end)
+        return end
+
+    @classmethod
+    def _scan(cls, file):
+        """
+        Read complete records from the current position of a journal file, without decoding them.
+
+        :param file: Journal file opened for binary reading.
+        :return: Iterator of (kind, data) tuples, data is the whole booking record or the pickled payload. Stops at
+         the end of the file or at an incomplete or unknown record.
+        """
+        while kind := file.read(1):
+            if kind in (cls.BOOKING, cls.CANCELLATION):
+                data = kind + file.read(cls.BOOKING_RECORD.size - 1)
+                if len(data) < cls.BOOKING_RECORD.size:
+                    return
+                yield kind, data
+            elif kind in (cls.VEHICLE, cls.CLIENT):
+                header = kind + file.read(cls.PAYLOAD_HEADER.size - 1)
+                if len(header) < cls.PAYLOAD_HEADER.size:
+                    return
+                length = cls.PAYLOAD_HEADER.unpack(header)[1]
+                data = file.read(length)
+                if length < 0 or len(data) < length:
+                    return
+                yield kind, data
+            else:
+                return
+
+
+class VehicleRental:
+    """
+    Vehicle rental system managing vehicles, rents and budget.
+
+    Rents may be placed from several threads. A rent holds the lock of the vehicle and then the lock of the client
+    while it checks availability and budget, and the rental wide lock only while it updates shared indexes and the
+    balance, so rents of different vehicles by different clients run independently. Every rental has a random
+    rental_id, which a client booking in several rentals uses to tell their bookings apart.
+    """
+
+    def __init__(self, pricing: PricingEngine = None, columnar: bool = False) -> None:
+        """
+        Construct new VehicleRental.
+
+        :param pricing: Pricing engine used to price bookings, default prices are used if not given.
+        :param columnar: If True, a FleetColumns copy of the fleet is kept in sync for analytics.
+        """
+        self.rental_id = uuid.uuid4().int
+        self.pricing = PricingEngine() if pricing is None else pricing
+        self.columns = FleetColumns() if columnar else None
         self.vehicles = set()
         self.bookings = {}
-        self.clients = []
+        self.calendars = {}
+        self.booked_on = {}
+        self.revenue_by_day = {}
+        self.revenue_by_type_day = {}
+        self.booked_by_type_day = {}
+        self.vehicle_counts_by_type = {}
+        self.vehicles_by_make = {}
+        self.cars_by_type = {}
+        self.vehicles_by_year = {}
+        self.years = []
+        self.rental_counts = {}
+        self.vehicle_ranking = Leaderboard()
+        self.clients = {}
+        self.client_rental_counts = {}
+        self.client_spending = {}
+        self.client_ranking = Leaderboard()
         self.balance = 0
+        self.vehicle_ids = {}
+        self.vehicles_by_id = []
+        self.journal = None
+        self.lock = threading.RLock()
+        self.vehicle_locks = {}
+        self.client_locks = {}
+
+    def __getstate__(self) -> dict:
+        """Return the state of the rental for pickling, without locks and journal."""
+        state = self.__dict__.copy()
+        for name in ('journal', 'lock', 'vehicle_locks', 'client_locks'):
+            del state[name]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        """Restore the rental from a pickled state, with new locks and no journal."""
+        self.__dict__.update(state)
+        self.journal = None
+        self.lock = threading.RLock()
+        self.vehicle_locks = {vehicle: threading.Lock() for vehicle in self.vehicles}
+        self.client_locks = {}
 
     def get_money(self) -> int:
         """
@@ -192,18 +1037,21 @@ class VehicleRental:
 
     def get_motorcycles(self) -> list[Motorcycle]:
         """:return: list of motorcycles in rental system."""
-        return [vehicle for vehicle in self.vehicles if isinstance(vehicle, Motorcycle)]
+        with self.lock:
+            return [vehicle for vehicle in self.vehicles if isinstance(vehicle, Motorcycle)]
 
     def get_cars(self) -> list[Car]:
         """:return: list of cars in rental system."""
-        return [vehicle for vehicle in self.vehicles if isinstance(vehicle, Car)]
+        with self.lock:
+            return [car for cars in self.cars_by_type.values() for car in cars]
 
     def get_vehicle_bookings_dict(self) -> dict[Car | Motorcycle, list[str]]:
         """
         Get a dictionary of vehicles and their booked dates.
 
         This method returns a dictionary where the keys are vehicle objects (either `Car` or `Motorcycle`)
-        and the values are lists of dates when the vehicles have been booked.
+        and the values are lists of dates when the vehicles have been booked. Dates are in the canonical zero padded
+        "dd.mm.yyyy" form.
 
         Example:
             {
@@ -217,7 +1065,16 @@ class VehicleRental:
 
     def get_clients(self) -> list[Client]:
         """:return: list of all clients who have placed a booking in rental."""
-        return self.clients
+        return list(self.clients.values())
+
+    def get_client(self, client_id: int) -> Client | None:
+        """
+        Find a client who has placed a booking in rental by their id.
+
+        :param client_id: Id of the client.
+        :return: The client with the given id or None if there is no such client.
+        """
+        return self.clients.get(client_id)
 
     def add_vehicle(self, vehicle: Car | Motorcycle) -> bool:
         """
@@ -228,13 +1085,61 @@ class VehicleRental:
         :param vehicle: Vehicle (Car or Motorcycle) to be added.
         :return: True if the vehicle was successfully added, False if it was already present.
         """
+        with self.lock:
+            return self._add_vehicle(vehicle)
+
+    def add_vehicles(self, vehicles) -> int:
+        """
+        Add many vehicles to the rental system at once.
+
+        Vehicles already present (by hash and equality) are skipped, as in add_vehicle.
+
+        :param vehicles: Iterable of vehicles (Car or Motorcycle) to be added.
+        :return: Number of vehicles that were added.
+        """
+        with self.lock:
+            return sum(self._add_vehicle(vehicle) for vehicle in vehicles)
+
+    def _add_vehicle(self, vehicle: Car | Motorcycle) -> bool:
+        """
+        Add a vehicle if it is not already present, holding the rental lock.
+
+        :param vehicle: Vehicle (Car or Motorcycle) to be added.
+        :return: True if the vehicle was added, False if it was already present.
+        """
         if vehicle in self.vehicles:
             return False
-        self.vehicles.add(vehicle)
         if vehicle not in self.bookings:
             self.bookings[vehicle] = []
+            self.calendars[vehicle] = BookingCalendar(self.bookings[vehicle])
+        self._index_vehicle(vehicle)
+        self.vehicle_counts_by_type[vehicle.price_key] = self.vehicle_counts_by_type.get(vehicle.price_key, 0) + 1
+        self.rental_counts[vehicle] = 0
+        self.vehicle_ranking.update(vehicle, (0, self.pricing.base_price(vehicle)))
+        if self.columns is not None:
+            self.columns.add(vehicle)
+        if self.journal is not None:
+            self.journal.write_vehicle(len(self.vehicles_by_id), vehicle)
+        self.vehicle_ids[vehicle] = len(self.vehicles_by_id)
+        self.vehicles_by_id.append(vehicle)
+        self.vehicle_locks[vehicle] = threading.Lock()
+        self.vehicles.add(vehicle)
         return True
 
+    def _index_vehicle(self, vehicle: Car | Motorcycle) -> None:
+        """
+        Add the vehicle to the make, type and year indexes.
+
+        :param vehicle: Vehicle (Car or Motorcycle) that was added to the rental.
+        """
+        self.vehicles_by_make.setdefault(vehicle.make.casefold(), []).append(vehicle)
+        if isinstance(vehicle, Car):
+            self.cars_by_type.setdefault(vehicle.type_of_car, []).append(vehicle)
+        if vehicle.year not in self.vehicles_by_year:
+            self.vehicles_by_year[vehicle.year] = []
+            bisect.insort(self.years, vehicle.year)
+        self.vehicles_by_year[vehicle.year].append(vehicle)
+
     def is_vehicle_available(self, vehicle: Car | Motorcycle, date: str) -> bool:
         """
         Check if the vehicle is available for rent on the specified date.
@@ -243,7 +1148,30 @@ class VehicleRental:
         :param date: The date to check availability on.
         :return: True if the vehicle is available, otherwise False.
         """
-        return date not in self.bookings.get(vehicle, [])
+        try:
+            day = date_to_ordinal(date)
+        except (TypeError, ValueError):
+            return False
+        calendar = self.calendars.get(vehicle)
+        return calendar is None or calendar.is_free(day)
+
+    def is_vehicle_available_for_range(self, vehicle: Car | Motorcycle, start_date: str, end_date: str) -> bool:
+        """
+        Check if the vehicle is available for rent on every date from start_date to end_date.
+
+        :param vehicle: The vehicle to check availability for.
+        :param start_date: The first date of the range (inclusive).
+        :param end_date: The last date of the range (inclusive).
+        :return: True if the vehicle is available for the whole range, otherwise False.
+        """
+        try:
+            start, end = date_to_ordinal(start_date), date_to_ordinal(end_date)
+        except (TypeError, ValueError):
+            return False
+        if start > end:
+            return False
+        calendar = self.calendars.get(vehicle)
+        return calendar is None or calendar.is_free_range(start, end)
 
     def rent_vehicle(self, vehicle: Car | Motorcycle, date: str, client: Client) -> bool:
         """
@@ -257,31 +1185,352 @@ class VehicleRental:
         :param date: Date for which the vehicle is being rented.
         :param client: Client who is renting the vehicle.
         :return: True if the rental was successful, otherwise False.
+        :raises ValueError: If another client with the same id is registered in the rental.
         """
         if not vehicle or not date or not client:
             return False
 
-        if vehicle not in self.vehicles:
+        vehicle_lock = self.vehicle_locks.get(vehicle)
+        if vehicle_lock is None:
             return False
 
-        if not self.is_vehicle_available(vehicle, date):
+        try:
+            day = date_to_ordinal(date)
+        except (TypeError, ValueError):
             return False
 
-        price = get_price(vehicle)
+        with vehicle_lock, self._client_lock(client):
+            if not self.calendars[vehicle].is_free(day):
+                return False
+
+            return self._book(vehicle, [(day, ordinal_to_date(day))], client)
+
+    def rent_vehicle_range(self, vehicle: Car | Motorcycle, start_date: str, end_date: str, client: Client) -> bool:
+        """
+        Rent a vehicle to a client for every date from start_date to end_date.
+
+        The whole range is booked at once: if any date is already booked or the client cannot pay for all the days,
+        nothing is booked. The price is the sum of the prices of the vehicle on each day.
 
-        if client.budget < price:
+        :param vehicle: Vehicle to be rented.
+        :param start_date: The first date of the rental (inclusive).
+        :param end_date: The last date of the rental (inclusive).
+        :param client: Client who is renting the vehicle.
+        :return: True if the rental was successful, otherwise False.
+        :raises ValueError: If another client with the same id is registered in the rental.
+        """
+        if not vehicle or not start_date or not end_date or not client:
             return False
 
-        client.budget -= price
-        self.balance += price
-        if vehicle not in self.bookings:
-            self.bookings[vehicle] = []
+        vehicle_lock = self.vehicle_locks.get(vehicle)
+        if vehicle_lock is None:
+            return False
+
+        try:
+            days = date_range(start_date, end_date)
+        except (TypeError, ValueError):
+            return False
+        if not days:
+            return False
+
+        with vehicle_lock, self._client_lock(client):
+            if not self.calendars[vehicle].is_free_range(days[0], days[-1]):
+                return False
+
+            return self._book(vehicle, [(day, ordinal_to_date(day)) for day in days], client)
+
+    def _client_lock(self, client: Client) -> threading.Lock:
+        """
+        Return the lock guarding the budget and bookings of the client in this rental.
+
+        :param client: Client who is renting a vehicle.
+        :return: Lock of the client, created on first use.
+        """
+        client_lock = self.client_locks.get(client.client_id)
+        if client_lock is None:
+            with self.lock:
+                client_lock = self.client_locks.setdefault(client.client_id, threading.Lock())
+        return client_lock
+
+    def _check_client(self, client: Client) -> None:
+        """
+        Make sure the id of the client is not used by another client of the rental.
+
+        Client ids are the keys of the client registry and of the client locks, so two clients with one id would
+        share both.
+
+        :param client: Client who is renting or cancelling.
+        :raises ValueError: If another client with the same id is registered in the rental.
+        """
+        registered = self.clients.get(client.client_id)
+        if registered is not None and registered is not client:
+            raise ValueError(f"Client id {client.client_id} is already used by another client.")
 
-        self.bookings[vehicle].append(date)
-        if client not in self.clients:
-            self.clients.append(client)
+    def _book(self, vehicle: Car | Motorcycle, days: list[tuple[int, str]], client: Client) -> bool:
+        """
+        Charge the client and book the vehicle for the given days.
+
+        Availability of the days must be checked by the caller, holding the locks of the vehicle and the client.
+
+        :param vehicle: Vehicle to be rented.
+        :param days: List of (day ordinal, date string) pairs to book.
+        :param client: Client who is renting the vehicle.
+        :return: True if the client could pay for all the days, otherwise False.
+        :raises ValueError: If another client with the same id is registered in the rental.
+        """
+        self._check_client(client)
+        prices = [self.pricing.price(vehicle, day) for day, date in days]
+        total_price = sum(prices)
+
+        if client.budget < total_price:
+            return False
+
+        if self.journal is not None:
+            if client.client_id not in self.clients:
+                self.journal.write_client(client)
+            booked_days = [day for day, date in days]
+            self.journal.write_bookings(self.vehicle_ids[vehicle], booked_days, client.client_id, prices)
+        self._apply_booking(vehicle, days, prices, client)
         return True
 
+    def _apply_booking(self, vehicle: Car | Motorcycle, days: list[tuple[int, str]], prices: list[int],
+                       client: Client) -> None:
+        """
+        Book the vehicle for the given days without any checks and update all the indexes.
+
+        :param vehicle: Vehicle to be rented.
+        :param days: List of (day ordinal, date string) pairs to book.
+        :param prices: Price of each day.
+        :param client: Client who is renting the vehicle.
+        """
+        total_price = sum(prices)
+        client.budget -= total_price
+        calendar = self.calendars[vehicle]
+        for (day, date), price in zip(days, prices):
+            client.add_booking(vehicle, day, price, self.rental_id)
+            calendar.book(day, client, price)
+        with self.lock:
+            self.balance += total_price
+            for (day, date), price in zip(days, prices):
+                self.booked_on.setdefault(day, set()).add(vehicle)
+                self.revenue_by_day[day] = self.revenue_by_day.get(day, 0) + price
+                key = (vehicle.price_key, day)
+                self.revenue_by_type_day[key] = self.revenue_by_type_day.get(key, 0) + price
+                self.booked_by_type_day[key] = self.booked_by_type_day.get(key, 0) + 1
+            self.rental_counts[vehicle] += len(days)
+            self.vehicle_ranking.update(vehicle, (self.rental_counts[vehicle], self.pricing.base_price(vehicle)))
+            if self.columns is not None:
+                self.columns.record_rental(vehicle, len(days), total_price)
+            if client.client_id not in self.clients:
+                self.clients[client.client_id] = client
+            self._rank_client(client, len(days), total_price)
+
+    def cancel_booking(self, vehicle: Car | Motorcycle, date: str, client: Client) -> bool:
+        """
+        Cancel a booking and refund the client.
+
+        The price paid for the booking is returned to the client and taken from the balance of the rental, and the
+        date becomes available again.
+
+        :param vehicle: The booked vehicle.
+        :param date: The booked date.
+        :param client: Client who made the booking.
+        :return: True if the booking was cancelled, False if the client had not booked the vehicle on that date.
+        :raises ValueError: If another client with the same id is registered in the rental.
+        """
+        if not vehicle or not date or not client:
+            return False
+
+        vehicle_lock = self.vehicle_locks.get(vehicle)
+        if vehicle_lock is None:
+            return False
+
+        try:
+            day = date_to_ordinal(date)
+        except (TypeError, ValueError):
+            return False
+
+        with vehicle_lock, self._client_lock(client):
+            self._check_client(client)
+            booking = self.calendars[vehicle].booked.get(day)
+            if booking is None or booking[0].client_id != client.client_id:
+                return False
+
+            if self.journal is not None:
+                self.journal.write_cancellation(self.vehicle_ids[vehicle], day, client.client_id, booking[1])
+            self._apply_cancellation(vehicle, day, client)
+            return True
+
+    def _apply_cancellation(self, vehicle: Car | Motorcycle, day: int, client: Client) -> None:
+        """
+        Cancel a booking without any checks and update all the indexes.
+
+        :param vehicle: The booked vehicle.
+        :param day: Day ordinal of the booking.
+        :param client: Client who made the booking.
+        """
+        client, price = self.calendars[vehicle].cancel(day)
+        client.remove_booking(vehicle, day, price, self.rental_id)
+        with self.lock:
+            self.balance -= price
+            booked = self.booked_on[day]
+            booked.discard(vehicle)
+            if not booked:
+                del self.booked_on[day]
+            self.revenue_by_day[day] -= price
+            key = (vehicle.price_key, day)
+            self.revenue_by_type_day[key] -= price
+            self.booked_by_type_day[key] -= 1
+            self.rental_counts[vehicle] -= 1
+            self.vehicle_ranking.update(vehicle, (self.rental_counts[vehicle], self.pricing.base_price(vehicle)))
+            if self.columns is not None:
+                self.columns.record_rental(vehicle, -1, -price)
+            self._rank_client(client, -1, -price)
+
+    def _rank_client(self, client: Client, days: int, money: int) -> None:
+        """
+        Add a change of the bookings of the client in this rental to their ranking, holding the rental lock.
+
+        :param client: Client who booked or cancelled.
+        :param days: Number of booked days, negative for cancelled days.
+        :param money: Money paid, negative for refunds.
+        """
+        rental_count = self.client_rental_counts[client.client_id] = \
+            self.client_rental_counts.get(client.client_id, 0) + days
+        spending = self.client_spending[client.client_id] = self.client_spending.get(client.client_id, 0) + money
+        self.client_ranking.update(client, (rental_count, spending))
+
+    def attach_journal(self, journal: BookingJournal) -> None:
+        """
+        Write all following changes of the rental to the journal.
+
+        Changes made before attaching are not in the journal, take a snapshot right after attaching to keep them.
+
+        :param journal: Journal to write to.
+        """
+        with self.lock:
+            self.journal = journal
+
+    def snapshot(self, path: str) -> None:
+        """
+        Save the whole state of the rental to a file.
+
+        No rent can be in progress while the snapshot is taken. The current journal position is saved with the state,
+        so restore only needs to replay the journal written after the snapshot.
+
+        :param path: Path of the snapshot file.
+        """
+        with contextlib.ExitStack() as locks:
+            while True:
+                vehicles = list(self.vehicles_by_id)
+                for vehicle in vehicles:
+                    locks.enter_context(self.vehicle_locks[vehicle])
+                locks.enter_context(self.lock)
+                if len(vehicles) == len(self.vehicles_by_id):
+                    break
+                locks.close()
+            offset = None if self.journal is None else self.journal.position()
+            data = pickle.dumps((offset, self), pickle.HIGHEST_PROTOCOL)
+        with open(path, 'wb') as file:
+            file.write(data)
+
+    @classmethod
+    def restore(cls, snapshot_path: str = None, journal_path: str = None, pricing: PricingEngine = None,
+                columnar: bool = False) -> 'VehicleRental':
+        """
+        Load a rental from a snapshot and replay the journal written after it.
+
+        An incomplete record at the end of the journal, left by a crash during a write, is cut off before the journal
+        is replayed and attached.
+
+        :param snapshot_path: Path of the snapshot file, an empty rental is used if not given.
+        :param journal_path: Path of the journal file, if given it is replayed and attached to the restored rental.
+        :param pricing: Pricing engine of the empty rental, used only if there is no snapshot.
+        :param columnar: Whether the empty rental keeps FleetColumns, used only if there is no snapshot.
+        :return: The restored rental.
+        """
+        rental, offset = cls(pricing, columnar), 0
+        if snapshot_path is not None:
+            with open(snapshot_path, 'rb') as file:
+                offset, rental = pickle.load(file)
+        if journal_path is not None:
+            BookingJournal.repair(journal_path, offset or 0)
+            rental._replay(journal_path, offset or 0)
+            rental.attach_journal(BookingJournal(journal_path))
+        Client.reserve_id(max(rental.clients, default=0))
+        return rental
+
+    def _replay(self, journal_path: str, offset: int) -> None:
+        """
+        Apply journal records to the rental.
+
+        :param journal_path: Path of the journal file.
+        :param offset: Position of the first record to apply.
+        """
+        new_clients = {}
+        for kind, fields in BookingJournal.read(journal_path, offset):
+            if kind == BookingJournal.VEHICLE:
+                vehicle_id, vehicle = fields
+                self.add_vehicle(vehicle)
+            elif kind == BookingJournal.CLIENT:
+                client_id, name, budget = fields
+                new_clients[client_id] = Client(name, budget, client_id)
+            elif kind == BookingJournal.BOOKING:
+                vehicle_id, day, client_id, price = fields
+                client = self.clients.get(client_id) or new_clients[client_id]
+                self._apply_booking(self.vehicles_by_id[vehicle_id], [(day, ordinal_to_date(day))], [price], client)
+            else:
+                vehicle_id, day, client_id, price = fields
+                self._apply_cancellation(self.vehicles_by_id[vehicle_id], day, self.clients[client_id])
+
+    def get_revenue_report(self, start_date: str, end_date: str, vehicle: Car | Motorcycle = None,
+                           type_of_car=None) -> list[tuple[str, int]]:
+        """
+        Return the revenue of every day from start_date to end_date.
+
+        Revenue is summed up per day as bookings are made, so the report takes time proportional to the number of
+        days in the range.
+
+        :param start_date: The first date of the report (inclusive).
+        :param end_date: The last date of the report (inclusive).
+        :param vehicle: If given, only the revenue of this vehicle is reported.
+        :param type_of_car: If given, only the revenue of this Type (or MOTORCYCLE) is reported.
+        :return: List of (date, revenue) tuples.
+        :raises ValueError: If the dates are not valid "dd.mm.yyyy" dates.
+        """
+        days = date_range(start_date, end_date)
+        if vehicle is not None:
+            booked = self.calendars[vehicle].booked if vehicle in self.calendars else {}
+            return [(ordinal_to_date(day), booked[day][1] if day in booked else 0) for day in days]
+        if type_of_car is not None:
+            return [(ordinal_to_date(day), self.revenue_by_type_day.get((type_of_car, day), 0)) for day in days]
+        return [(ordinal_to_date(day), self.revenue_by_day.get(day, 0)) for day in days]
+
+    def get_utilisation_report(self, start_date: str, end_date: str, vehicle: Car | Motorcycle = None,
+                               type_of_car=None) -> list[tuple[str, float]]:
+        """
+        Return the share of booked vehicles for every day from start_date to end_date.
+
+        The share is computed against the current fleet, in time proportional to the number of days in the range.
+
+        :param start_date: The first date of the report (inclusive).
+        :param end_date: The last date of the report (inclusive).
+        :param vehicle: If given, 1.0 is reported for the days this vehicle is booked and 0.0 for others.
+        :param type_of_car: If given, only vehicles of this Type (or MOTORCYCLE) are counted.
+        :return: List of (date, share of booked vehicles) tuples.
+        :raises ValueError: If the dates are not valid "dd.mm.yyyy" dates.
+        """
+        days = date_range(start_date, end_date)
+        if vehicle is not None:
+            booked = self.calendars[vehicle].booked if vehicle in self.calendars else {}
+            return [(ordinal_to_date(day), float(day in booked)) for day in days]
+        if type_of_car is not None:
+            fleet_size = self.vehicle_counts_by_type.get(type_of_car, 0) or 1
+            return [(ordinal_to_date(day), self.booked_by_type_day.get((type_of_car, day), 0) / fleet_size)
+                    for day in days]
+        fleet_size = len(self.vehicles) or 1
+        return [(ordinal_to_date(day), len(self.booked_on.get(day, ())) / fleet_size) for day in days]
+
     def get_most_rented_vehicle(self) -> list[Motorcycle | Car]:
         """
         Return the most rented vehicle(s) from the rental system.
@@ -290,14 +1539,23 @@ class VehicleRental:
          rented the same number of times, all of those are returned. If no vehicle have been rented, return an empty
          list.
         """
-        if not self.bookings:
-            return []
+        most_rented = []
+        for vehicle in self.vehicle_ranking:
+            count = self.rental_counts[vehicle]
+            if count == 0 or most_rented and count < self.rental_counts[most_rented[0]]:
+                break
+            most_rented.append(vehicle)
+        return most_rented
+
+    def get_top_rented_vehicles(self, n: int) -> list[Car | Motorcycle]:
+        """
+        Return the n most rented vehicles.
 
-        rental_counts = {vehicle: len(dates) for vehicle, dates in self.bookings.items() if dates}
-        if len(rental_counts) < 1:
-            return []
-        max_rentals = max(rental_counts.values())
-        return [vehicle for vehicle, count in rental_counts.items() if count == max_rentals]
+        In case of a tie, vehicles are sorted by price from highest to lowest.
+        :param n: Number of vehicles to return.
+        :return: A list of at most n vehicles sorted by popularity and price.
+        """
+        return self.vehicle_ranking.top(n)
 
     def find_vehicle_by_make(self, make: str) -> list[Car | Motorcycle]:
         """
@@ -306,7 +1564,7 @@ class VehicleRental:
         :param make: Manufacturer to search for (case-insensitive).
         :return: A list of vehicles matching the given make.
         """
-        return [vehicle for vehicle in self.vehicles if make.lower() == vehicle.make.lower()]
+        return list(self.vehicles_by_make.get(make.casefold(), []))
 
     def find_car_by_type(self, type_of_car: Type) -> list[Car]:
         """
@@ -315,19 +1573,168 @@ class VehicleRental:
         :param type_of_car: The type of car to search for (an instance of Type enum).
         :return: A list of cars matching the given type.
         """
-        return [vehicle for vehicle in self.get_cars() if vehicle.type_of_car == type_of_car]
+        return list(self.cars_by_type.get(type_of_car, []))
+
+    def find_available_vehicles(self, dates: str | tuple[str, str], type_of_car: Type = None, make: str = None,
+                                year_range: tuple[int, int] = None) -> list[Car | Motorcycle]:
+        """
+        Find vehicles that are free on the given date or for the whole given date range.
+
+        Vehicles booked on a date are looked up from the date index, so only the bookings of the requested dates are
+        visited.
+
+        :param dates: A date or a (start_date, end_date) tuple, both dates inclusive.
+        :param type_of_car: If given, only cars of this type are returned.
+        :param make: If given, only vehicles of this manufacturer (case-insensitive) are returned.
+        :param year_range: If given, only vehicles manufactured within this (start_year, end_year) range are returned.
+        :return: A list of vehicles available on all the given dates and matching the given filters, or an empty list
+                 if the start date of the range is after its end date.
+        :raises ValueError: If the dates are not valid "dd.mm.yyyy" dates.
+        """
+        days = date_range(*dates) if isinstance(dates, tuple) else [date_to_ordinal(dates)]
+        if not days:
+            return []
+        with self.lock:
+            booked = set()
+            for day in days:
+                booked.update(self.booked_on.get(day, ()))
+            candidates = self._filter_vehicles(type_of_car, make, year_range)
+            return [vehicle for vehicle in candidates if vehicle not in booked]
+
+    def _filter_vehicles(self, type_of_car: Type = None, make: str = None,
+                         year_range: tuple[int, int] = None) -> list[Car | Motorcycle]:
+        """
+        Return vehicles matching all the given filters.
+
+        :param type_of_car: If given, only cars of this type are returned.
+        :param make: If given, only vehicles of this manufacturer (case-insensitive) are returned.
+        :param year_range: If given, only vehicles manufactured within this (start_year, end_year) range are returned.
+        :return: A list of matching vehicles.
+        """
+        indexed = [self.vehicles]
+        if type_of_car is not None:
+            indexed.append(self.cars_by_type.get(type_of_car, []))
+        if make is not None:
+            make = make.casefold()
+            indexed.append(self.vehicles_by_make.get(make, []))
+        if year_range is not None:
+            indexed.append(self.get_vehicles_by_year_range(*year_range))
+        candidates = min(indexed, key=len)
+        return [
+            vehicle for vehicle in candidates
+            if (type_of_car is None or isinstance(vehicle, Car) and vehicle.type_of_car == type_of_car)
+            and (make is None or vehicle.make.casefold() == make)
+            and (year_range is None or year_range[0] <= vehicle.year <= year_range[1])
+        ]
+
+    def allocate(self, requests: list[BookingRequest], objective: str = 'revenue') -> list[Car | Motorcycle | None]:
+        """
+        Rent vehicles for a batch of requests at once.
+
+        Requests are handled greedily in an order suited to the objective:
+        for 'revenue' the most valuable requests go first and get the most expensive acceptable vehicle they can pay,
+        for 'fulfilled' the shortest requests go first and get the cheapest acceptable vehicle, which leaves more
+        vehicles and budget for the others. Vehicles are grouped by Type once per batch, so a request only looks at
+        vehicles it would accept. For every pool, make filter and date range the batch keeps a cursor past the
+        vehicles already found taken or unacceptable, so each of them is visited once per distinct date range and
+        filter, not once per request.
+
+        :param requests: Booking requests.
+        :param objective: 'revenue' to earn as much as possible, 'fulfilled' to fulfil as many requests as possible.
+        :return: For every request, in the given order, the rented vehicle or None if nothing could be rented.
+        :raises ValueError: If the objective is unknown.
+        """
+        if objective not in ('revenue', 'fulfilled'):
+            raise ValueError(f"Unknown objective: {objective}")
+        with self.lock:
+            pools = {}
+            for vehicle in self.vehicles_by_id:
+                pools.setdefault(vehicle.price_key, []).append(vehicle)
+
+        prepared = []
+        for index, request in enumerate(requests):
+            try:
+                days = date_range(request.start_date, request.end_date)
+            except (TypeError, ValueError):
+                continue
+            if not days:
+                continue
+            keys = [key for key in pools if request.types is None or key in request.types]
+            keys.sort(key=lambda key: self.pricing.base_price(pools[key][0]), reverse=objective == 'revenue')
+            budget = request.client.budget if request.budget is None else request.budget
+            if objective == 'revenue':
+                best_price = max((self.pricing.base_price(pools[key][0]) for key in keys), default=0)
+                order = -min(budget, best_price * len(days))
+            else:
+                order = len(days)
+            prepared.append((order, index, request, days, keys, budget))
+        prepared.sort(key=lambda item: item[:2])
+
+        result = [None] * len(requests)
+        cursors = {}
+        for order, index, request, days, keys, budget in prepared:
+            result[index] = self._allocate_request(request, days, keys, budget, pools, cursors)
+        return result
+
+    def _allocate_request(self, request: BookingRequest, days: range, keys: list, budget: int, pools: dict,
+                          cursors: dict) -> Car | Motorcycle | None:
+        """
+        Rent the first acceptable vehicle for one request.
+
+        :param request: The booking request.
+        :param days: Day ordinals of the request.
+        :param keys: Acceptable price keys in the order they are tried.
+        :param budget: Most the request may cost.
+        :param pools: Vehicles grouped by price key.
+        :param cursors: Dictionary with (price key, makes, first day, last day) as keys and the position of the first
+         vehicle of the pool that may still be free and acceptable as values, shared by the whole batch.
+        :return: The rented vehicle or None.
+        """
+        start_date, end_date = ordinal_to_date(days[0]), ordinal_to_date(days[-1])
+        makes = None if request.makes is None else frozenset(request.makes)
+        for key in keys:
+            pool = pools[key]
+            cost = sum(self.pricing.price(pool[0], day) for day in days)
+            if cost > budget or cost > request.client.budget:
+                continue
+            cursor = (key, makes, days[0], days[-1])
+            position = cursors.get(cursor, 0)
+            while position < len(pool):
+                vehicle = pool[position]
+                if (makes is None or vehicle.make.casefold() in makes) and \
+                        self.calendars[vehicle].is_free_range(days[0], days[-1]):
+                    if self.rent_vehicle_range(vehicle, start_date, end_date, request.client):
+                        cursors[cursor] = position + 1
+                        return vehicle
+                    if self.calendars[vehicle].is_free_range(days[0], days[-1]):
+                        break
+                position += 1
+            cursors[cursor] = position
+        return None
 
     def get_best_client(self) -> Client:
         """
         Return the best client who rented the most vehicles.
 
         If multiple clients have rented the same number of vehicles, return the client who spent the most money.
+        Only bookings made in this rental are counted.
         :return: The best client object.
         """
-        if not self.clients:
+        if not self.client_ranking:
             return None
 
-        return max(self.clients, key=lambda client: (len(client.get_bookings()), client.total_spent()))
+        return self.client_ranking.top(1)[0]
+
+    def get_top_clients(self, n: int) -> list[Client]:
+        """
+        Return the n clients who rented the most vehicles.
+
+        In case of a tie, clients are sorted by the money spent from highest to lowest. Only bookings made in this
+        rental are counted.
+        :param n: Number of clients to return.
+        :return: A list of at most n clients.
+        """
+        return self.client_ranking.top(n)
 
     def get_sorted_vehicles_list(self) -> list[Car | Motorcycle]:
         """
@@ -336,7 +1743,7 @@ class VehicleRental:
         In case of a tie, vehicles are sorted by price from highest to lowest.
         :return: A list of vehicles sorted by popularity and price.
         """
-        return sorted(self.vehicles, key=lambda vehicle: (-len(self.bookings.get(vehicle, [])), -get_price(vehicle)))
+        return list(self.vehicle_ranking)
 
     def get_vehicles_by_year_range(self, start_year: int, end_year: int) -> list[Car | Motorcycle] | ValueError:
         """
@@ -350,4 +1757,307 @@ class VehicleRental:
         if not isinstance(start_year, int) or not isinstance(end_year, int) or start_year > end_year:
             raise ValueError("Invalid year range.")
 
-        return [vehicle for vehicle in self.vehicles if start_year <= vehicle.year <= end_year]
+        first = bisect.bisect_left(self.years, start_year)
+        last = bisect.bisect_right(self.years, end_year)
+        return [vehicle for year in self.years[first:last] for vehicle in self.vehicles_by_year[year]]
+
+
+class AsyncVehicleRental:
+    """
+    Asyncio front-end for VehicleRental.
+
+    Rent requests are queued per vehicle. One task per vehicle takes all the requests waiting for that vehicle and
+    runs them as one batch in an executor thread, so the event loop is never blocked by the rental and a vehicle is
+    handled by at most one thread at a time.
+    """
+
+    def __init__(self, rental: VehicleRental, executor=None) -> None:
+        """
+        Construct new AsyncVehicleRental.
+
+        :param rental: The rental service requests are forwarded to.
+        :param executor: Executor running the batches, the default executor of the event loop is used if not given.
+        """
+        self.rental = rental
+        self.executor = executor
+        self.queues = {}
+        self.tasks = set()
+
+    async def rent_vehicle(self, vehicle: Car | Motorcycle, date: str, client: Client) -> bool:
+        """
+        Rent a vehicle to a client for a specified date, see VehicleRental.rent_vehicle.
+
+        :param vehicle: Vehicle to be rented.
+        :param date: Date for which the vehicle is being rented.
+        :param client: Client who is renting the vehicle.
+        :return: True if the rental was successful, otherwise False.
+        """
+        return await self._submit(vehicle, self.rental.rent_vehicle, (vehicle, date, client))
+
+    async def book_range(self, vehicle: Car | Motorcycle, start_date: str, end_date: str, client: Client) -> bool:
+        """
+        Rent a vehicle to a client for a date range, see VehicleRental.rent_vehicle_range.
+
+        :param vehicle: Vehicle to be rented.
+        :param start_date: The first date of the rental (inclusive).
+        :param end_date: The last date of the rental (inclusive).
+        :param client: Client who is renting the vehicle.
+        :return: True if the rental was successful, otherwise False.
+        """
+        return await self._submit(vehicle, self.rental.rent_vehicle_range, (vehicle, start_date, end_date, client))
+
+    async def find_available(self, dates: str | tuple[str, str], type_of_car: Type = None, make: str = None,
+                             year_range: tuple[int, int] = None) -> list[Car | Motorcycle]:
+        """
+        Find vehicles free on the given date or date range, see VehicleRental.find_available_vehicles.
+
+        :param dates: A date or a (start_date, end_date) tuple, both dates inclusive.
+        :param type_of_car: If given, only cars of this type are returned.
+        :param make: If given, only vehicles of this manufacturer (case-insensitive) are returned.
+        :param year_range: If given, only vehicles manufactured within this (start_year, end_year) range are returned.
+        :return: A list of vehicles available on all the given dates and matching the given filters.
+        """
+        loop = asyncio.get_running_loop()
+        search = functools.partial(self.rental.find_available_vehicles, dates, type_of_car, make, year_range)
+        return await loop.run_in_executor(self.executor, search)
+
+    def _submit(self, vehicle: Car | Motorcycle, function, args: tuple) -> asyncio.Future:
+        """
+        Queue a call for the vehicle and start its worker task if needed.
+
+        :param vehicle: Vehicle the call is about.
+        :param function: Rental method to call.
+        :param args: Arguments of the call.
+        :return: Future resolved with the result of the call.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if vehicle not in self.queues:
+            queue = self.queues[vehicle] = []
+            task = loop.create_task(self._drain(vehicle))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            task.add_done_callback(functools.partial(self._abandon, vehicle, queue))
+        self.queues[vehicle].append((function, args, future))
+        return future
+
+    def _abandon(self, vehicle: Car | Motorcycle, queue: list, task: asyncio.Task) -> None:
+        """
+        Cancel the queued calls of a worker task that was cancelled before it started.
+
+        A started task replaces the queue it was created with, so the queue is still in place only if the task never
+        ran.
+
+        :param vehicle: Vehicle of the worker task.
+        :param queue: The queue the task was created with.
+        :param task: The finished task.
+        """
+        if self.queues.get(vehicle) is queue:
+            del self.queues[vehicle]
+            for function, args, future in queue:
+                future.cancel()
+
+    async def _drain(self, vehicle: Car | Motorcycle) -> None:
+        """
+        Run queued calls of the vehicle in batches until its queue is empty.
+
+        Calls whose futures were cancelled while waiting in the queue are dropped. If a batch cannot be run, its
+        futures and the calls still queued fail with the error.
+
+        :param vehicle: Vehicle whose queue is drained.
+        """
+        loop = asyncio.get_running_loop()
+        batch, failure = [], None
+        try:
+            while self.queues[vehicle]:
+                batch = [call for call in self.queues[vehicle] if not call[2].cancelled()]
+                self.queues[vehicle] = []
+                if not batch:
+                    continue
+                results = await loop.run_in_executor(self.executor, self._run_batch, batch)
+                for (function, args, future), (error, result) in zip(batch, results):
+                    if future.cancelled():
+                        continue
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)
+        except Exception as error:
+            failure = error
+        finally:
+            for function, args, future in batch + self.queues.pop(vehicle):
+                if future.done():
+                    continue
+                if failure is None:
+                    future.cancel()
+                else:
+                    future.set_exception(failure)
+
+    @staticmethod
+    def _run_batch(batch: list) -> list[tuple]:
+        """
+        Run a batch of calls.
+
+        :param batch: List of (function, args, future) tuples.
+        :return: List of (exception, result) tuples, exception is None if the call succeeded.
+        """
+        results = []
+        for function, args, future in batch:
+            try:
+                results.append((None, function(*args)))
+            except Exception as error:
+                results.append((error, None))
+        return results
+
+
+FLEET_FIELDS = ['kind', 'make', 'model', 'year', 'type']
+BOOKING_FIELDS = FLEET_FIELDS + ['date', 'client_id', 'name', 'budget']
+
+
+def vehicle_from_row(row: dict) -> Car | Motorcycle:
+    """
+    Create a vehicle from a fleet file row.
+
+    :param row: Dictionary with kind ("car" or "motorcycle"), make, model, year and type (Type name, cars only).
+    :return: The vehicle described by the row.
+    :raises ValueError: If the kind, year or type is not valid.
+    """
+    kind = row['kind'].lower()
+    if kind == 'motorcycle':
+        return Motorcycle(row['make'], row['model'], int(row['year']))
+    if kind == 'car' and row['type'] in Type.__members__:
+        return Car(row['make'], row['model'], int(row['year']), Type[row['type']])
+    raise ValueError(f"Invalid vehicle row: {row}")
+
+
+def vehicle_to_row(vehicle: Car | Motorcycle) -> dict:
+    """
+    Describe a vehicle as a fleet file row.
+
+    :param vehicle: Vehicle (Car or Motorcycle).
+    :return: Dictionary with kind, make, model, year and type.
+    """
+    if isinstance(vehicle, Car):
+        return {'kind': 'car', 'make': vehicle.make, 'model': vehicle.model, 'year': vehicle.year,
+                'type': vehicle.type_of_car.name}
+    return {'kind': 'motorcycle', 'make': vehicle.make, 'model': vehicle.model, 'year': vehicle.year, 'type': ''}
+
+
+def read_rows(path: str):
+    """
+    Read rows from a CSV file with a header line or from a JSON lines file.
+
+    The format is chosen by the file extension: ".csv" is CSV, anything else is JSON lines.
+
+    :param path: Path of the file.
+    :return: Iterator of rows as dictionaries, the file is read lazily.
+    """
+    with open(path, newline='', encoding='utf-8') as file:
+        if path.endswith('.csv'):
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def write_rows(path: str, fields: list[str], rows) -> int:
+    """
+    Write rows to a CSV or JSON lines file, chosen by the file extension as in read_rows.
+
+    :param path: Path of the file.
+    :param fields: Names of the columns.
+    :param rows: Iterable of rows as dictionaries, written one by one.
+    :return: Number of rows written.
+    """
+    count = 0
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        if path.endswith('.csv'):
+            writer = csv.DictWriter(file, fields)
+            writer.writeheader()
+            for row in rows:
+                writer.writerow(row)
+                count += 1
+        else:
+            for row in rows:
+                file.write(json.dumps(row) + '\n')
+                count += 1
+    return count
+
+
+def import_fleet(vehicle_rental: VehicleRental, path: str, chunk_size: int = 10_000) -> int:
+    """
+    Add all the vehicles of a fleet file to the rental.
+
+    The file is read in chunks of chunk_size rows, each chunk is added with one add_vehicles call.
+
+    :param vehicle_rental: Rental the vehicles are added to.
+    :param path: Path of a CSV or JSON lines fleet file.
+    :param chunk_size: Number of rows read at once.
+    :return: Number of vehicles that were added, duplicates are not counted.
+    """
+    rows = read_rows(path)
+    added = 0
+    while chunk := [vehicle_from_row(row) for row in itertools.islice(rows, chunk_size)]:
+        added += vehicle_rental.add_vehicles(chunk)
+    return added
+
+
+def export_fleet(vehicle_rental: VehicleRental, path: str) -> int:
+    """
+    Write all the vehicles of the rental to a fleet file.
+
+    :param vehicle_rental: Rental whose vehicles are written.
+    :param path: Path of a CSV or JSON lines fleet file.
+    :return: Number of vehicles written.
+    """
+    return write_rows(path, FLEET_FIELDS, map(vehicle_to_row, vehicle_rental.vehicles_by_id))
+
+
+def import_bookings(vehicle_rental: VehicleRental, path: str) -> int:
+    """
+    Rent vehicles for all the bookings of a bookings file.
+
+    Each row is rented with rent_vehicle, so unavailable dates and clients without enough budget are skipped.
+    Clients not yet registered in the rental are created with the id, name and budget of the row, and ids generated
+    for new clients afterwards are larger than the imported ids.
+
+    :param vehicle_rental: Rental the bookings are made in.
+    :param path: Path of a CSV or JSON lines bookings file.
+    :return: Number of successful bookings.
+    :raises ValueError: If the name of a row does not match the client already known by the id of the row.
+    """
+    new_clients = {}
+    booked = 0
+    for row in read_rows(path):
+        client_id = int(row['client_id'])
+        client = vehicle_rental.get_client(client_id) or new_clients.get(client_id)
+        if client is None:
+            client = new_clients[client_id] = Client(row['name'], int(row['budget']), client_id)
+        elif client.name != row['name']:
+            raise ValueError(f"Client id {client_id} belongs to {client.name}, not to {row['name']}.")
+        booked += vehicle_rental.rent_vehicle(vehicle_from_row(row), row['date'], client)
+    return booked
+
+
+def export_bookings(vehicle_rental: VehicleRental, path: str) -> int:
+    """
+    Write all the bookings of the rental to a bookings file.
+
+    The budget of a client is written as it was before all of their bookings, so importing the file into an empty
+    rental with the same fleet recreates the bookings and budgets.
+
+    :param vehicle_rental: Rental whose bookings are written.
+    :param path: Path of a CSV or JSON lines bookings file.
+    :return: Number of bookings written.
+    """
+    def rows():
+        for vehicle in vehicle_rental.vehicles_by_id:
+            vehicle_row = vehicle_to_row(vehicle)
+            calendar = vehicle_rental.calendars[vehicle]
+            for day in calendar:
+                client, price = calendar.booked[day]
+                yield vehicle_row | {'date': ordinal_to_date(day), 'client_id': client.client_id, 'name': client.name,
+                                     'budget': client.budget + client.spent}
+
+    return write_rows(path, BOOKING_FIELDS, rows())